@@ -2,159 +2,201 @@ import argparse
 
 import numpy as np
 
+# Elevation of every byte value: "a" is 0 and "z" is 25, with the start "S"
+# sitting at "a" level and the target "E" at "z" level.
+HEIGHTS = np.arange(256, dtype=np.int16) - ord("a")
+HEIGHTS[ord("S")] = 0
+HEIGHTS[ord("E")] = ord("z") - ord("a")
+
+DIRS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Peak bytes allocated per frontier cell while expanding one BFS level: the
+# frontier and its rows/cols (24), the int64 indices and masks built for each
+# direction (~110 while in flight), the up to four kept children (32), and
+# np.unique's concatenated input, sorted copy and result (3 * 32).
+BYTES_PER_FRONTIER_CELL = 160
+
 
 def load_graph(file: str) -> np.ndarray:
-    """Loads puzzle file and creates a grid with each position's height.
+    """Memory-maps the puzzle file as a (rows, cols) grid of raw uint8 bytes.
 
-    Starting position is -1, and target is 26 (= ord("z") - 96)
+    Nothing is read into RAM here: the returned array is a strided view over
+    the file that skips the newline at the end of each row, and cells are only
+    paged in when the search touches them.
 
     Args:
         file (str): Path to puzzle file
 
     Returns:
-        np.ndarray: Array with each position's height
+        np.ndarray: Read-only uint8 view of the map letters
     """
-    raw = np.genfromtxt(file, dtype=None, encoding=None)
-    N, M = len(raw), len(raw[0])
-    graph = [[] for _ in range(N)]
-    for i in range(N):
-        for j in range(M):
-            val = raw[i][j]
-            if val not in ("S", "E"):
-                graph[i].append(ord(val) - 97)
-            elif val == "S":
-                graph[i].append(-1)
-            elif val == "E":
-                graph[i].append(ord("z") - 96)
-    return np.array(graph)
-
-
-def is_valid(
-    graph: np.ndarray, parent: tuple[int, int], child: tuple[int, int]
-) -> bool:
-    """Checks if the tuple child is a child node from parent in the given grid.
+    with open(file, "rb") as f:
+        first_line = f.readline()
+    width = len(first_line.rstrip(b"\r\n"))
+    stride = len(first_line)
+    newline = stride - width
+    raw = np.memmap(file, dtype=np.uint8, mode="r")
+    rows = (raw.size + newline) // stride
+    return np.lib.stride_tricks.as_strided(
+        raw, shape=(rows, width), strides=(stride, 1), writeable=False
+    )
+
+
+def find_cell(graph: np.ndarray, letter: str, chunk_rows: int = 4096) -> int:
+    """Finds the flat index of the first cell holding letter.
+
+    The grid is scanned in blocks of chunk_rows rows so that the temporary
+    boolean mask stays bounded whatever the size of the map.
 
     Args:
-        graph (np.ndarray): Array with each position's height
-        parent (tuple[int,int]): Coordinates of parent's node
-        child (tuple[int,int]): Coordinates of child's node
+        graph (np.ndarray): Grid of raw map letters
+        letter (str): Letter to look for
+        chunk_rows (int, optional): Rows scanned at once. Defaults to 4096.
 
     Returns:
-        bool: True if one can go from parent to child
+        int: Flat index of the cell
+
+    Raises:
+        ValueError: If the letter is not in the map
     """
+    M = graph.shape[1]
+    for i in range(0, graph.shape[0], chunk_rows):
+        hits = np.flatnonzero(graph[i : i + chunk_rows] == ord(letter))
+        if hits.size > 0:
+            return i * M + int(hits[0])
+    raise ValueError(f"No {letter!r} cell in the map")
 
-    N, M = graph.shape
-    if child[1] < M and child[0] < N and min(child) > -1:
-        return graph[child] - graph[parent] <= 1
-    else:
-        return False
 
+def check_memory(visited: np.ndarray, frontier: np.ndarray, max_memory: int) -> None:
+    """Raises if the search state no longer fits in the memory budget.
 
-def find_unvisited_neighbours(
-    graph: np.ndarray, coord: tuple[int, int], already_visited: set
-) -> list:
-    """Creates a list of unvisited neighbours for coord.
+    The state is the visited bitset plus the peak of temporaries allocated
+    while expanding the frontier, BYTES_PER_FRONTIER_CELL per frontier cell.
 
     Args:
-        graph (np.ndarray): Array with each position's height
-        coord (tuple[int, int]): Coordinates of current position
-        already_visited (set): Set of already visited nodes with BFS
+        visited (np.ndarray): Bitset of visited cells
+        frontier (np.ndarray): Flat indices of the current frontier
+        max_memory (int): Memory budget in bytes, None for no limit
 
-    Returns:
-        list: List of unvisited coord's neighbours coordinates
+    Raises:
+        MemoryError: If the state would have to be spilled to disk
     """
-    i, j = coord
-    dirs = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    return [
-        ((i + k, j + l), coord)
-        for k, l in dirs
-        if (i + k, j + l) not in already_visited
-        and is_valid(graph, coord, (i + k, j + l))
-    ]
-
-
-def bfs(graph: np.ndarray, start: tuple, end: int = 26) -> int:
-    """Performs Breadth First Search from a start position until it finds the end node.
+    if max_memory is None:
+        return
+    needed = visited.nbytes + BYTES_PER_FRONTIER_CELL * frontier.size
+    if needed > max_memory:
+        raise MemoryError(
+            f"BFS needs {needed} bytes ({visited.nbytes} for the visited bitset, "
+            f"{needed - visited.nbytes} for a frontier of {frontier.size} cells) "
+            f"but the budget is {max_memory} bytes: a spill would be required"
+        )
+
+
+def bfs(
+    graph: np.ndarray,
+    start: int,
+    end: str = "E",
+    reverse: bool = False,
+    max_memory: int = None,
+) -> int:
+    """Performs a frontier-based Breadth First Search from start to any end cell.
+
+    Only a visited bitset (one bit per cell) and the current/next frontiers of
+    flat indices are kept in memory, each level being expanded in one go.
 
     Args:
-        graph (np.ndarray): Array with each position's height
-        start (tuple, optional): Coordinates of starting position
-        end (int, optional): Value of target node. Defaults to 26.
+        graph (np.ndarray): Grid of raw map letters
+        start (int): Flat index of the starting position
+        end (str, optional): Letters accepted as target. Defaults to "E".
+        reverse (bool, optional): Walks the climbing rule backwards, i.e. one
+            can step down by at most one. Defaults to False.
+        max_memory (int, optional): Memory budget in bytes. Defaults to None.
 
     Returns:
         int: Returns the length of the shortest path from start until the end.
     """
     N, M = graph.shape
-
-    # Initialization
-    depth = np.zeros((N, M), dtype=np.uint32)
-    depth[start] = 0
-    already_visited = set()
-    already_visited.add(start)
-    queue = find_unvisited_neighbours(graph, start, already_visited)
-    end_found = False
-
-    # Loops over the queued nodes
-    while not end_found and len(queue) > 0:
-        coord, parent = queue.pop(0)
-        if coord not in already_visited:
-            depth[coord] = depth[parent] + 1
-            already_visited.add(coord)
-            if graph[coord] == end:
-                end_found = True
-            else:
-                queue += find_unvisited_neighbours(graph, coord, already_visited)
-    if end_found:
-        return depth[coord]
-    else:
-        # If not found, returns infinity
-        return np.inf
-
-
-def part_1(file: str) -> int:
+    targets = np.array([ord(letter) for letter in end], dtype=np.uint8)
+
+    visited = np.zeros((N * M + 7) // 8, dtype=np.uint8)
+    visited[start >> 3] |= 1 << (start & 7)
+    frontier = np.array([start], dtype=np.int64)
+    depth = 0
+
+    while frontier.size > 0:
+        check_memory(visited, frontier, max_memory)
+        rows, cols = np.divmod(frontier, M)
+        letters = graph[rows, cols]
+        if np.isin(letters, targets).any():
+            return depth
+        heights = HEIGHTS[letters]
+
+        children = []
+        for k, l in DIRS:
+            i, j = rows + k, cols + l
+            inside = (i >= 0) & (i < N) & (j >= 0) & (j < M)
+            i, j = i[inside], j[inside]
+            climb = HEIGHTS[graph[i, j]] - heights[inside]
+            valid = (-climb if reverse else climb) <= 1
+            idx = i[valid] * M + j[valid]
+            unseen = (visited[idx >> 3] >> (idx & 7).astype(np.uint8)) & 1 == 0
+            children.append(idx[unseen])
+
+        frontier = np.unique(np.concatenate(children))
+        np.bitwise_or.at(
+            visited, frontier >> 3, np.left_shift(1, frontier & 7).astype(np.uint8)
+        )
+        depth += 1
+
+    # If not found, returns infinity
+    return np.inf
+
+
+def part_1(file: str, max_memory: int = None) -> int:
     """Computes the shortest path from starting position to final position.
 
     Args:
         file (str): Path to puzzle file
+        max_memory (int, optional): Memory budget in bytes. Defaults to None.
 
     Returns:
         int: Lenght of the shortest path between start and end
     """
     graph = load_graph(file)
-    start = np.unravel_index(np.argmin(graph), graph.shape)
-    return bfs(graph=graph, start=start)
+    start = find_cell(graph, "S")
+    return bfs(graph=graph, start=start, max_memory=max_memory)
 
 
-def part_2(file: str) -> int:
+def part_2(file: str, max_memory: int = None) -> int:
     """Computes the shortest possible path from "a" to "E" in the graph.
 
+    Instead of one search per "a" cell, a single search walks backwards from
+    "E" and stops at the first "a" (or "S") it reaches.
+
     Args:
         file (str): Path to puzzle file
+        max_memory (int, optional): Memory budget in bytes. Defaults to None.
 
     Returns:
         int: Lenght of the shortest possible path between any "a" and E nodes
     """
     graph = load_graph(file)
-
-    initials = np.argwhere(graph <= 0)
-
-    min_val = np.inf
-    for coord in initials:
-        coord = tuple(coord)
-        path_length = bfs(graph=graph, start=coord)
-        if min_val > path_length:
-            min_val = path_length
-    return min_val
+    end = find_cell(graph, "E")
+    return bfs(graph=graph, start=end, end="aS", reverse=True, max_memory=max_memory)
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 12 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--max-memory", type=int, default=None, help="Memory budget for the BFS in MB"
+    )
     args = parser.parse_args()
+    max_memory = None if args.max_memory is None else args.max_memory * 2**20
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    sol1 = part_1(file=args.file, max_memory=max_memory)
+    sol2 = part_2(file=args.file, max_memory=max_memory)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
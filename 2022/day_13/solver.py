@@ -1,129 +1,228 @@
 import argparse
-import ast
+import collections
+import re
 
+TOKEN = re.compile(r"\d+|\[|\]")
+DIVIDERS = ("[[2]]", "[[6]]")
 
-def read_input(file: str) -> list:
-    """Loads input file to a list of couples to compare.
+
+def parse_packet(line: str) -> tuple:
+    """Parses a packet into nested tuples of integers.
 
     Args:
-        file (str): Path to puzzle file
+        line (str): Raw packet, e.g. "[1,[2,3],4]"
 
     Returns:
-        list: List of couples to compare
+        tuple: Packet as nested tuples, e.g. (1, (2, 3), 4)
     """
-    packets = []
-    with open(file) as f:
-        raw = f.read().splitlines()
-    for i in range(len(raw) // 3 + 1):
-        u, v = raw[3 * i : 3 * i + 2]
-        packets.append([ast.literal_eval(u), ast.literal_eval(v)])
-    return packets
+    stack = [[]]
+    for token in TOKEN.findall(line):
+        if token == "[":
+            stack.append([])
+        elif token == "]":
+            packet = tuple(stack.pop())
+            stack[-1].append(packet)
+        else:
+            stack[-1].append(int(token))
+    return stack[0][0]
 
 
-def compare(left, right) -> bool:
-    """Compares two values recursively.
+def read_input(file: str, parse: callable = parse_packet) -> list:
+    """Loads input file to a list of couples to compare.
 
     Args:
-        left (int or list): _description_
-        right (int or list): _description_
+        file (str): Path to puzzle file
+        parse (callable, optional): Function turning a line into a packet.
+            Defaults to parse_packet.
 
     Returns:
-        bool: Returns True if the inputs are in the right order
+        list: List of couples to compare
     """
-    if type(left) == type(right) and type(left) == int:
-        if left != right:
-            return left < right
-    elif type(left) == type(right) and type(left) == list:
-        if len(left) == 0:
-            return True
-        elif len(right) == 0:
-            return False
-        else:
-            for i, val in enumerate(zip(left, right)):
-                l, r = val
-                out = compare(l, r)
-                if out is not None:
-                    return out
-            if i == len(left) - 1:
-                return True
+    with open(file) as f:
+        packets = [parse(line) for line in f if line.strip()]
+    return list(zip(packets[::2], packets[1::2]))
+
+
+class PacketComparator:
+    def __init__(self, cache_size: int = 2**16):
+        """Compares packets iteratively, caching the results of interned pairs.
+
+        Packets are interned by their raw text, so duplicated packets are
+        parsed once and share the same object. The result of comparing two
+        interned packets is kept in a bounded LRU cache keyed by their ids.
+
+        Args:
+            cache_size (int, optional): Maximum number of cached pairs.
+                Defaults to 2**16.
+        """
+        self.cache_size = cache_size
+        self.packets = {}
+        self.interned_ids = set()
+        self.cache = collections.OrderedDict()
+        self.comparisons = 0
+        self.cache_hits = 0
+        self.max_depth = 0
+
+    def intern(self, line: str) -> tuple:
+        """Parses a packet, reusing the existing object if it was already seen.
+
+        Args:
+            line (str): Raw packet
+
+        Returns:
+            tuple: Interned packet as nested tuples
+        """
+        line = line.strip()
+        if line not in self.packets:
+            packet = parse_packet(line)
+            self.packets[line] = packet
+            self.interned_ids.add(id(packet))
+        return self.packets[line]
+
+    @property
+    def hit_rate(self) -> float:
+        return self.cache_hits / self.comparisons if self.comparisons else 0.0
+
+    def stats(self) -> dict:
+        """Returns the counters gathered so far."""
+        return {
+            "comparisons": self.comparisons,
+            "cache_hits": self.cache_hits,
+            "hit_rate": self.hit_rate,
+            "max_depth": self.max_depth,
+            "interned_packets": len(self.packets),
+        }
+
+    def __call__(self, left, right) -> int:
+        """Compares two packets, looking up the cache first if both are interned.
+
+        Args:
+            left (int or tuple): Left value
+            right (int or tuple): Right value
+
+        Returns:
+            int: -1 if the inputs are in the right order, 1 if they are in the
+                wrong order and 0 if they are equal
+        """
+        self.comparisons += 1
+        if id(left) not in self.interned_ids or id(right) not in self.interned_ids:
+            return self.compare(left, right)
+
+        key = (id(left), id(right))
+        if key in self.cache:
+            self.cache_hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        out = self.compare(left, right)
+        self.cache[key] = out
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return out
+
+    def compare(self, left, right) -> int:
+        """Compares two values with an explicit stack instead of recursion.
+
+        Each stack frame holds two values and the position reached in them.
+        An integer compared to a list behaves as a list of length one without
+        actually being wrapped, so no tuple is allocated for the promotion.
+
+        Args:
+            left (int or tuple): Left value
+            right (int or tuple): Right value
+
+        Returns:
+            int: -1 if the inputs are in the right order, 1 if they are in the
+                wrong order and 0 if they are equal
+        """
+        if type(left) == int and type(right) == int:
+            return (left > right) - (left < right)
+
+        stack = [[left, right, 0]]
+        while stack:
+            frame = stack[-1]
+            l, r, i = frame
+            len_l = 1 if type(l) == int else len(l)
+            len_r = 1 if type(r) == int else len(r)
+            if i == len_l or i == len_r:
+                if len_l != len_r:
+                    return -1 if len_l < len_r else 1
+                stack.pop()
+                continue
+
+            frame[2] = i + 1
+            a = l if type(l) == int else l[i]
+            b = r if type(r) == int else r[i]
+            if type(a) == int and type(b) == int:
+                if a != b:
+                    return -1 if a < b else 1
             else:
-                return False
-    elif type(left) == int:
-        out = compare([left], right)
-        if out is not None:
-            return out
-    elif type(right) == int:
-        out = compare(left, [right])
-        if out is not None:
-            return out
-
+                stack.append([a, b, 0])
+                self.max_depth = max(self.max_depth, len(stack))
+        return 0
 
-def bubble_sort(idx_list: list, compare: callable, packets_list: list) -> None:
-    """Sorts input_list in place using a bubble_sort technique.
 
-    Works on the indices of the packets instead of on the packets themselves.
-
-    Args:
-        idx_list (list): List of indices of the packets
-        compare (callable): Function to call on two elements to check wether they are properly ordered
-        packets_list (list): The actual packets to compare
-    """
-    N = len(idx_list)
-
-    for i in range(N):
-        for j in range(0, N - i - 1):
-            if not compare(packets_list[idx_list[j]], packets_list[idx_list[j + 1]]):
-                idx_list[j], idx_list[j + 1] = idx_list[j + 1], idx_list[j]
-
-
-def part_1(file: str) -> int:
+def part_1(file: str, comparator: PacketComparator = None) -> int:
     """Computes the sum of the indices of the packets in the right order.
 
     Args:
         file (str): Path to puzzle file
+        comparator (PacketComparator, optional): Comparator to use. Defaults
+            to a fresh one.
 
     Returns:
         int: Sum of the indices of the pairs of packets in the right order
     """
-    packets = read_input(file)
-    comparisons = [compare(left, right) for left, right in packets]
+    comparator = comparator or PacketComparator()
+    packets = read_input(file, parse=comparator.intern)
+    comparisons = [comparator(left, right) < 0 for left, right in packets]
     return sum([i + 1 for i, val in enumerate(comparisons) if val])
 
 
-def part_2(file: str) -> int:
-    """Sorts the packets in the appropriate order and computes the final score.
+def part_2(file: str, comparator: PacketComparator = None) -> int:
+    """Finds where the divider packets would land once sorted and computes the final score.
+
+    There is no need to sort the whole signal: the index of a divider is one
+    plus the number of packets that come before it, which takes a single
+    linear pass per divider.
 
     Args:
         file (str): Path to puzzle file
+        comparator (PacketComparator, optional): Comparator to use. Defaults
+            to a fresh one.
 
     Returns:
         int: Returns the product of the indices of the divider packets after sorting them.
     """
-    packets = read_input(file)
-
-    # Creates a list with the packets
-    packets_list = [[[2]], [[6]]]
-    for pair in packets:
-        packets_list += [pair[0], pair[1]]
+    comparator = comparator or PacketComparator()
+    packets = [
+        packet
+        for pair in read_input(file, parse=comparator.intern)
+        for packet in pair
+    ]
+    dividers = [comparator.intern(divider) for divider in DIVIDERS]
+    packets += dividers
 
-    # Sorts the list
-    idx_list = list(range(len(packets_list)))
-    bubble_sort(idx_list, compare, packets_list)
-    sorted_packets = [packets_list[idx] for idx in idx_list]
-
-    return (sorted_packets.index(packets_list[0]) + 1) * (
-        sorted_packets.index(packets_list[1]) + 1
-    )
+    decoder_key = 1
+    for divider in dividers:
+        decoder_key *= 1 + sum(comparator(packet, divider) < 0 for packet in packets)
+    return decoder_key
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 13 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--stats", action="store_true", help="Prints the comparator counters"
+    )
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    comparator = PacketComparator()
+    sol1 = part_1(file=args.file, comparator=comparator)
+    sol2 = part_2(file=args.file, comparator=comparator)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
+    if args.stats:
+        for name, value in comparator.stats().items():
+            print(f"{name}: {value}")
@@ -2,6 +2,8 @@ import argparse
 
 import numpy as np
 
+AIR, SAND, ROCK, SOURCE = range(4)
+
 
 def read_input(file: str) -> list:
     """Creates a list with each rock path from the input file.
@@ -40,9 +42,9 @@ def draw_rocks(
     x0, y0 = start
     x1, y1 = end
     if x0 == x1:
-        grid[x0, min(y0, y1) - offset : max(y0, y1) + 1 - offset] = 2
+        grid[x0, min(y0, y1) - offset : max(y0, y1) + 1 - offset] = ROCK
     else:
-        grid[min(x0, x1) : max(x0, x1) + 1, y0 - offset] = 2
+        grid[min(x0, x1) : max(x0, x1) + 1, y0 - offset] = ROCK
 
 
 def create_rock_structure(rock_paths: list, part=1) -> np.ndarray:
@@ -60,7 +62,7 @@ def create_rock_structure(rock_paths: list, part=1) -> np.ndarray:
     y_max = max([max([coord[1] for coord in path]) for path in rock_paths])
     H = x_max + 1 + 2 * (part == 2)
     W = y_max - y_min + 1
-    grid = np.zeros((H, W))
+    grid = np.zeros((H, W), dtype=np.uint8)
 
     for path in rock_paths:
         pivot = path[0]
@@ -68,7 +70,7 @@ def create_rock_structure(rock_paths: list, part=1) -> np.ndarray:
             draw_rocks(grid, start=pivot, end=point, offset=y_min)
             pivot = point
     # Sand source
-    grid[0, 500 - y_min] = -1
+    grid[0, 500 - y_min] = SOURCE
 
     if part == 2:
         grid = np.pad(
@@ -79,25 +81,6 @@ def create_rock_structure(rock_paths: list, part=1) -> np.ndarray:
     return grid
 
 
-def checks_rest(grid: np.ndarray, x: int, y: int) -> bool:
-    """Checks if a sand unit is at rest at coordinates (x,y)
-
-    Args:
-        grid (np.ndarray): Grid of the cave
-        x (int): x-axis coordinate
-        y (int): y-axis coordinate
-
-    Returns:
-        bool: True if the sand unit is at rest
-    """
-    if x < grid.shape[0] - 1 and y < grid.shape[1] - 1:
-        return (
-            grid[x + 1, y] != 0 and grid[x + 1, y + 1] != 0 and grid[x + 1, y - 1] != 0
-        )
-    else:
-        return False
-
-
 def sand_step(grid: np.ndarray, x: int, y: int) -> tuple[int, int]:
     """Performs one falling step for a sand unit at (x,y)
 
@@ -107,19 +90,15 @@ def sand_step(grid: np.ndarray, x: int, y: int) -> tuple[int, int]:
         y (int): y-axis coordinate
 
     Returns:
-        tuple[int, int]: The next position of the sand unit
+        tuple[int, int]: The next position of the sand unit, which is (x,y)
+            itself if the unit is at rest and may lie out of the grid
     """
-    if x < grid.shape[0] - 1:
-        if grid[x + 1, y] == 0:
-            return x + 1, y
-        elif grid[x + 1, y - 1] == 0:
-            return x + 1, y - 1
-        elif grid[x + 1, y + 1] == 0:
-            return x + 1, y + 1
-        else:
-            return x, y
-    else:
+    if x == grid.shape[0] - 1:
         return x + 1, y
+    for dy in (0, -1, 1):
+        if checks_out(grid, x + 1, y + dy) or grid[x + 1, y + dy] == AIR:
+            return x + 1, y + dy
+    return x, y
 
 
 def checks_out(grid: np.ndarray, x: int, y: int) -> bool:
@@ -136,77 +115,106 @@ def checks_out(grid: np.ndarray, x: int, y: int) -> bool:
     return not (0 <= x and x < grid.shape[0] and 0 <= y and y < grid.shape[1])
 
 
-def simulate_sandfall(grid: np.ndarray, rest: np.ndarray) -> np.ndarray:
-    """Simulates the fall of a sand unit until it reaches rest.
+def simulate_sandfall(grid: np.ndarray) -> int:
+    """Simulates the fall of sand units until no more can come to rest.
+
+    The path followed by the falling unit is kept on a stack. Once a unit
+    rests, the next one is identical up to the cell right above it, so the
+    simulation resumes from there instead of from the source. Each cell is
+    pushed and popped at most once, so the total work is linear in the number
+    of units.
 
     Args:
-        grid (np.ndarray): Grid of the cave
-        rest (np.ndarray): Binary grid of fallen sand units in rest
+        grid (np.ndarray): Grid of the cave, updated in place with the sand
 
     Returns:
-        np.ndarray: The updated grid with sand and rock
+        int: Number of sand units at rest, stopping either when a unit falls
+            out of the grid or when the source gets blocked
     """
-    x, y = np.argwhere(grid == -1)[0]
-    is_rest = False
-    while not is_rest:
-        x, y = sand_step(grid, x, y)
-        is_rest = checks_rest(grid, x, y)
-        if checks_out(grid, x, y):
+    x, y = np.argwhere(grid == SOURCE)[0]
+    path = [(x, y)]
+    counter = 0
+    while path:
+        x, y = path[-1]
+        next_x, next_y = sand_step(grid, x, y)
+        if checks_out(grid, next_x, next_y):
             break
+        if (next_x, next_y) == (x, y):
+            grid[x, y] = SAND
+            counter += 1
+            path.pop()
+        else:
+            path.append((next_x, next_y))
+    return counter
 
-    if not checks_out(grid, x, y):
-        grid[x, y] = 1
-        rest[x, y] = 1
-    return grid, rest
 
+def fill_floor(grid: np.ndarray) -> int:
+    """Counts the sand units at rest above an infinite floor without simulating them.
 
-def count_drops(grid: np.ndarray, part: int = 1) -> int:
-    """Counts the drops of sand until no more can fall.
+    With a floor, a cell ends up filled with sand if and only if it is not a
+    rock and one of the three cells above it is filled. The filled cells are
+    thus computed row by row, each row being the previous one dilated by one
+    cell on each side and masked by the rocks.
 
     Args:
-        grid (np.ndarray): Grid of the cave
-        part (int, optional): Part of the problem to solve. Defaults to 1.
+        grid (np.ndarray): Grid of the cave, with the floor as its last row
 
     Returns:
-        int: Number of dropped units of sand
+        int: Number of sand units at rest once the source is blocked
     """
-    rest = np.zeros(grid.shape)
-    converged = False
-    counter = -1
-    while not converged:
-        past_rest = np.copy(rest)
-        counter += 1
-        grid, rest = simulate_sandfall(grid, rest)
-        if part == 1:
-            converged = (rest == past_rest).all()
-        else:
-            converged = -1 not in grid
-    return counter + 1 * (part == 2)
-
-
-def solver(file: str, part: int) -> int:
+    x, y = np.argwhere(grid == SOURCE)[0]
+    rocks = grid == ROCK
+    row = np.zeros(grid.shape[1], dtype=bool)
+    row[y] = True
+    counter = 1
+    for i in range(x + 1, grid.shape[0]):
+        below = row.copy()
+        below[1:] |= row[:-1]
+        below[:-1] |= row[1:]
+        row = below & ~rocks[i]
+        counter += int(row.sum())
+    return counter
+
+
+def solver(file: str, part: int, check: bool = False) -> int:
     """Computes the drops of sand units that fall until equilibrium.
 
+    Part 2 is computed directly with fill_floor.
+
     Args:
         file (str): Path to puzzle file
         part (int): Part of the problem to solve.
+        check (bool, optional): Also runs the step simulator for part 2 and
+            checks both counts agree. Defaults to False.
 
     Returns:
         int: Number of sand units fallen until equilibrium.
     """
     paths = read_input(file)
     grid = create_rock_structure(rock_paths=paths, part=part)
-    return count_drops(grid=grid, part=part)
+    if part == 1:
+        return simulate_sandfall(grid=grid)
+
+    counter = fill_floor(grid=grid)
+    if check:
+        simulated = simulate_sandfall(grid=grid)
+        assert counter == simulated, f"Floor fill gives {counter}, simulation {simulated}"
+    return counter
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 12 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Cross-checks the part 2 floor fill against the step simulator",
+    )
     args = parser.parse_args()
 
     sol1 = solver(file=args.file, part=1)
-    sol2 = solver(file=args.file, part=2)
+    sol2 = solver(file=args.file, part=2, check=args.check)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
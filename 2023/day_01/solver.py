@@ -1,7 +1,111 @@
 import argparse
-import re
+import collections
+import mmap
+import os
 
-import numpy as np
+DIGITS = {str(i).encode(): i for i in range(10)}
+WORDS = {
+    word.encode(): i
+    for i, word in enumerate(
+        ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine"],
+        start=1,
+    )
+}
+
+
+def build_automaton(patterns: dict[bytes, int]) -> tuple[list, list]:
+    """Builds an Aho-Corasick automaton recognising the given patterns.
+
+    The transitions are fully expanded (failure links are folded into them),
+    so scanning a byte is a single table lookup.
+
+    Args:
+        patterns (dict[bytes, int]): Maps each pattern to its value
+
+    Returns:
+        tuple[list, list]: Transition table indexed as table[state][byte], and
+            the value of the pattern recognised at each state (-1 if none)
+    """
+    table, outputs = [[0] * 256], [-1]
+    for pattern, value in patterns.items():
+        state = 0
+        for byte in pattern:
+            if table[state][byte] == 0:
+                table.append([0] * 256)
+                outputs.append(-1)
+                table[state][byte] = len(table) - 1
+            state = table[state][byte]
+        outputs[state] = value
+
+    # Breadth-first pass to fold the failure links into the transitions
+    fail = [0] * len(table)
+    queue = collections.deque(s for s in table[0] if s != 0)
+    while queue:
+        state = queue.popleft()
+        if outputs[state] == -1:
+            outputs[state] = outputs[fail[state]]
+        for byte in range(256):
+            child = table[state][byte]
+            if child != 0:
+                fail[child] = table[fail[state]][byte]
+                queue.append(child)
+            else:
+                table[state][byte] = table[fail[state]][byte]
+    return table, outputs
+
+
+def find_first(data, positions: range, table: list, outputs: list) -> int:
+    """Feeds the bytes of data at the given positions until a pattern is recognised.
+
+    Args:
+        data (bytes or mmap.mmap): Raw document
+        positions (range): Positions to read, in scanning order
+        table (list): Transition table of the automaton
+        outputs (list): Pattern value recognised at each state
+
+    Returns:
+        int: Value of the first pattern found, -1 if there is none
+    """
+    state = 0
+    for i in positions:
+        state = table[state][data[i]]
+        if outputs[state] != -1:
+            return outputs[state]
+    return -1
+
+
+def calibration_sum(file: str, patterns: dict[bytes, int]) -> int:
+    """Sums the calibration values of every line of the document.
+
+    Each line is scanned from the left with the automaton of the patterns,
+    and from the right with the automaton of the reversed patterns, stopping
+    at the first match in both cases. Since no pattern lies strictly inside
+    another one, the first match to end is also the first one to start.
+
+    Args:
+        file (str): Path to the puzzle input
+        patterns (dict[bytes, int]): Maps each pattern to its digit
+
+    Returns:
+        int: Total sum of calibration values
+    """
+    forward = build_automaton(patterns)
+    backward = build_automaton({p[::-1]: value for p, value in patterns.items()})
+    total = 0
+    if os.path.getsize(file) == 0:
+        # An empty file cannot be memory-mapped
+        return total
+    with open(file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < len(data):
+            end = data.find(b"\n", start)
+            end = len(data) if end == -1 else end
+            first = find_first(data, range(start, end), *forward)
+            if first != -1:
+                last = find_first(data, range(end - 1, start - 1, -1), *backward)
+                total += 10 * first + last
+            start = end + 1
+    return total
 
 
 def part_1(file: str) -> int:
@@ -13,16 +117,7 @@ def part_1(file: str) -> int:
     Returns:
         int: Total sum of calibration values
     """
-    pattern = r"\d+"
-    document = np.loadtxt(file, dtype=str)
-    calibration_vals = []
-    for line in document:
-        nums = re.findall(pattern, line)
-        start, end = nums[0], nums[-1]
-        start = start[0] if len(start) > 1 else start
-        end = end[-1] if len(end) > 1 else end
-        calibration_vals.append(int("".join([start, end])))
-    return sum(calibration_vals)
+    return calibration_sum(file, DIGITS)
 
 
 def part_2(file: str) -> int:
@@ -35,24 +130,7 @@ def part_2(file: str) -> int:
     Returns:
         int: Total sum of calibration values
     """
-    pattern = r"\d+"
-    document = np.loadtxt(file, dtype=str)
-    replacements = dict(zip(
-        ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine"],
-        range(1, 10),
-    ))
-    for num, target in replacements.items():
-        replacements[num] = f"{num[0]}{target}{num[-1]}"
-    calibration_vals = []
-    for line in document:
-        for num, target in replacements.items():
-            line = line.replace(num, str(target))
-        nums = re.findall(pattern, line)
-        start, end = nums[0], nums[-1]
-        start = start[0] if len(start) > 1 else start
-        end = end[-1] if len(end) > 1 else end
-        calibration_vals.append(int("".join([start, end])))
-    return sum(calibration_vals)
+    return calibration_sum(file, DIGITS | WORDS)
 
 
 if __name__ == "__main__":
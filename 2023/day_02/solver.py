@@ -1,44 +1,69 @@
 import argparse
-from collections import defaultdict
 import re
 
 import numpy as np
 
+COLORS = ("red", "green", "blue")
+PATTERN = re.compile(r"Game (\d+)|(\d+) (red|green|blue)")
 
-def part_1(file: str) -> int:
+
+def read_games(file: str) -> tuple[np.ndarray, np.ndarray]:
+    """Parses the game records in a single regex pass over the whole file.
+
+    Args:
+        file (str): Path to the puzzle input
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: The IDs of the games, and a
+            (games x colors) array with the maximum number of cubes of each
+            color shown during each game, colors being ordered as in COLORS.
+    """
+    with open(file) as f:
+        records = f.read()
+
+    game_ids, rows, cols, counts = [], [], [], []
+    for game_id, count, color in PATTERN.findall(records):
+        if game_id:
+            game_ids.append(int(game_id))
+        else:
+            rows.append(len(game_ids) - 1)
+            cols.append(COLORS.index(color))
+            counts.append(int(count))
+
+    maxima = np.zeros((len(game_ids), len(COLORS)), dtype=np.int64)
+    np.maximum.at(maxima, (rows, cols), counts)
+    return np.array(game_ids, dtype=np.int64), maxima
+
+
+def possible_games(maxima: np.ndarray, bags: np.ndarray) -> np.ndarray:
+    """Checks which games are possible for each bag of a batch of bags.
+
+    Args:
+        maxima (np.ndarray): (games x colors) array of cubes shown per game
+        bags (np.ndarray): (bags x colors) array of cubes in each bag
+
+    Returns:
+        np.ndarray: (bags x games) boolean array, True if the game is possible
+            with the bag
+    """
+    bags = np.atleast_2d(bags)
+    return (maxima[np.newaxis] <= bags[:, np.newaxis]).all(axis=2)
+
+
+def part_1(file: str, bag: tuple[int, int, int] = (12, 13, 14)) -> int:
     """Computes the sum of the IDs of game that would have been possible if the
     the bag contained only 12 red cubes, 13 green cubes, and 14 blue cubes.
 
     Args:
         file (str): Path to the puzzle input
+        bag (tuple[int, int, int], optional): Number of red, green and blue
+            cubes in the bag. Defaults to (12, 13, 14).
 
     Returns:
         int: Total sum of IDs of games compatible.
     """
-    max_per_color = {'red': 12, 'green': 13, 'blue': 14}
-
-    def game_is_compatible(line: str) -> bool:
-        """Check if game is compatible with constraints."""
-        compatibilities = []
-        for subset in line.split(";"):
-            for color, max_val in max_per_color.items():
-                res = re.findall(f"(\d+) {color}", subset)
-                if len(res):
-                    val = int(res[0])
-                else:
-                    val = 0
-                compatibilities.append(val <= max_val)
-        return all(compatibilities)
-
-    compatible_ids = []
-    with open(file) as f:
-        for idx, line in enumerate(f.readlines()):
-            game_id = idx + 1
-            line = line.rstrip()
-            if game_is_compatible(line):
-                compatible_ids.append(game_id)
-
-    return sum(compatible_ids)
+    game_ids, maxima = read_games(file)
+    return int(game_ids[possible_games(maxima, np.array(bag))[0]].sum())
 
 
 def part_2(file: str) -> int:
@@ -51,36 +76,24 @@ def part_2(file: str) -> int:
     Returns:
         int: The sum of the powers computed on all games.
     """
-    max_per_color = {'red': 12, 'green': 13, 'blue': 14}
-
-    def minimum_number_of_cubes(line: str) -> list[int]:
-        history = defaultdict(list)
-        for subset in line.split(";"):
-            for color, _ in max_per_color.items():
-                res = re.findall(f"(\d+) {color}", subset)
-                if len(res):
-                    history[color].append(int(res[0]))
-                else:
-                    history[color].append(0)
-        minimums = [max(values) for _, values in history.items()]
-        return minimums
-
-    powers = []
-    with open(file) as f:
-        for line in f.readlines():
-            line = line.rstrip()
-            powers.append(np.prod(minimum_number_of_cubes(line)))
-
-    return sum(powers)
+    _, maxima = read_games(file)
+    return int(maxima.prod(axis=1).sum())
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 2 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--bag",
+        type=int,
+        nargs=3,
+        default=(12, 13, 14),
+        help="Number of red, green and blue cubes in the bag",
+    )
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
+    sol1 = part_1(file=args.file, bag=tuple(args.bag))
     sol2 = part_2(file=args.file)
 
     print(f"Part 1 solution: {sol1}")
@@ -1,55 +1,42 @@
 import argparse
-from collections import defaultdict
 import re
 
 import numpy as np
 
 
-def create_array_from_schematic(doc: list[str]):
-    """Create array from the engine schematic with one character per entry."""
-    map = np.zeros((len(doc), len(doc[0])), dtype=str)
-    N, M = map.shape
-    for i in range(N):
-        for j in range(M):
-            map[i][j] = doc[i][j]
-    return map
-
-
-def map_and_group_values(doc: list[str], map: np.ndarray):
-    """Stores in two dictionaries the total number a tuple of indices belong to
-    and, for each number, the list of tuples containing its different digits."""
-    pattern = r'\d+'
-    idx_to_number = {}
-    number_to_coords = defaultdict(list)
-    for idx, line in enumerate(doc):
-        res = [(match.group(), match.start())
-               for match in re.finditer(pattern, line)]
-        if res:
-            for num, start in res:
-                for k in range(len(num)):
-                    idx_to_number[(idx, start + k)] = int(num)
-                number_to_coords[int(num)].append(
-                    [(idx, start + k) for k in range(len(num))])
-    return idx_to_number, number_to_coords
-
-
-def is_symbol(value):
-    """Return true if value is a symbol different from a digit or a dot."""
-    pattern = "[^0-9.]"
-    return bool(len(re.findall(pattern, value)))
-
-
-def get_neighborhood(map: np.ndarray, i: int, j: int):
-    """Retrieves neighbor indices from the entry (i, j) of map if they contain
-    digits."""
-    neighbors = []
-    N, M = map.shape
-    for x in range(max(0, i - 1), min(N, i + 2)):
-        for y in range(max(0, j - 1), min(M, j + 2)):
-            if (x, y) != (i, j):
-                if re.findall("\d+", map[x][y]):
-                    neighbors.append((x, y))
-    return neighbors
+def read_schematic(file: str) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the engine schematic as a uint8 array with one character per
+    entry, along with the value of every number in reading order."""
+    with open(file, "rb") as f:
+        lines = f.read().split()
+    grid = np.frombuffer(b"".join(lines), dtype=np.uint8)
+    values = np.array([int(num) for num in re.findall(rb"\d+", b"\n".join(lines))])
+    return grid.reshape(len(lines), -1), values
+
+
+def label_numbers(grid: np.ndarray) -> np.ndarray:
+    """Labels each run of digits with a unique span id, in reading order,
+    starting from 1. Entries which are not digits are labeled 0."""
+    digits = (grid >= ord("0")) & (grid <= ord("9"))
+    starts = digits.copy()
+    starts[:, 1:] &= ~digits[:, :-1]
+    labels = np.cumsum(starts, dtype=np.int32).reshape(grid.shape)
+    return np.where(digits, labels, 0)
+
+
+def neighborhoods(array: np.ndarray) -> np.ndarray:
+    """Stacks the 3x3 windows around every entry of array, padding the borders
+    with zeros. The result has shape (9, N, M)."""
+    N, M = array.shape
+    padded = np.pad(array, 1)
+    return np.stack([padded[i : i + N, j : j + M] for i in range(3) for j in range(3)])
+
+
+def is_symbol(grid: np.ndarray) -> np.ndarray:
+    """Returns a mask of the entries that are symbols, i.e. neither a digit nor
+    a dot."""
+    digits = (grid >= ord("0")) & (grid <= ord("9"))
+    return ~digits & (grid != ord("."))
 
 
 def part_1(file: str) -> int:
@@ -61,29 +48,13 @@ def part_1(file: str) -> int:
     Returns:
         int: Total sum of part numbers.
     """
-    doc = np.loadtxt(file, dtype=str, comments=None)
-    map = create_array_from_schematic(doc)
-    idx_to_number, number_to_coords = map_and_group_values(doc, map)
-
-    N, M = map.shape
-    num_parts, seen_coords = [], []
-    for i in range(N):
-        for j in range(M):
-            if is_symbol(map[i][j]):
-                neighbours = get_neighborhood(map, i, j)
-                if neighbours:
-                    for x, y in neighbours:
-                        val = idx_to_number[(x, y)]
-                        for curr_coords in number_to_coords[val]:
-                            if (x, y) in curr_coords:
-                                break
-                        if any([c in seen_coords for c in curr_coords]):
-                            continue
-                        else:
-                            num_parts.append(val)
-                            seen_coords.append((x, y))
-
-    return sum(num_parts)
+    grid, values = read_schematic(file)
+    labels = label_numbers(grid)
+
+    # Binary dilation of the symbols with a 3x3 structuring element
+    near_symbol = neighborhoods(is_symbol(grid)).any(axis=0)
+    part_labels = np.unique(labels[near_symbol & (labels > 0)])
+    return int(values[part_labels - 1].sum())
 
 
 def part_2(file: str) -> int:
@@ -95,31 +66,20 @@ def part_2(file: str) -> int:
     Returns:
         int: The sum of the gear ratios.
     """
-    doc = np.loadtxt(file, dtype=str, comments=None)
-    map = create_array_from_schematic(doc)
-    idx_to_number, number_to_coords = map_and_group_values(doc, map)
-
-    N, M = map.shape
-    gear_ratios = []
-    for i in range(N):
-        for j in range(M):
-            if map[i][j] == "*":
-                neighbours = get_neighborhood(map, i, j)
-                if neighbours:
-                    value_groups = []
-                    for x, y in neighbours:
-                        val = idx_to_number[(x, y)]
-                        for curr_coords in number_to_coords[val]:
-                            if (x, y) in curr_coords:
-                                break
-                        if curr_coords not in value_groups:
-                            value_groups.append(curr_coords)
-                    if len(value_groups) == 2:
-                        gear_ratios.append(
-                            int(idx_to_number[value_groups[0][0]]) *
-                            int(idx_to_number[value_groups[1][0]]))
-
-    return sum(gear_ratios)
+    grid, values = read_schematic(file)
+    labels = label_numbers(grid)
+
+    # Sorted labels of the 3x3 window around each star, one row per star
+    windows = np.sort(neighborhoods(labels)[:, grid == ord("*")].T, axis=1)
+    is_new = windows != np.pad(windows, ((0, 0), (1, 0)))[:, :-1]
+    nb_numbers = (is_new & (windows > 0)).sum(axis=1)
+
+    # With exactly two distinct labels, these are the largest one and the
+    # smallest non-zero one
+    gears = windows[nb_numbers == 2]
+    first = np.where(gears > 0, gears, gears.max(axis=1, keepdims=True)).min(axis=1)
+    second = gears.max(axis=1)
+    return int((values[first - 1] * values[second - 1]).sum())
 
 
 if __name__ == "__main__":
@@ -1,28 +1,27 @@
 import argparse
-from typing import Sequence
 
+import numpy as np
 
-def parse_input(line: str) -> tuple[set[int], Sequence[int]]:
-    """Parses each line corresponding to a card."""
-    winning_nums, my_nums = line.split(" | ")
-    winning_nums = winning_nums.split(": ")[-1]
-    winning_nums = {int(n) for n in winning_nums.split() if n}
-    my_nums = [int(n) for n in my_nums.split() if n]
-    return winning_nums, my_nums
 
-
-def compute_score(winning_nums: set[int], my_nums: Sequence[int]) -> int:
-    """Computes the score from a card."""
-    power = -1
-    for num in my_nums:
-        if num in winning_nums:
-            power += 1
-    return 2**power if power != -1 else 0
+def read_cards(file: str) -> tuple[np.ndarray, np.ndarray]:
+    """Parses all the cards into two fixed-width matrices, one row per card,
+    holding the winning numbers and the numbers I have."""
+    with open(file) as f:
+        tokens = f.read().split()
+    # Every card reads "Card", "<id>:", winning numbers, "|", my numbers
+    sep = tokens.index("|")
+    width = tokens.index("Card", 1) if "Card" in tokens[1:] else len(tokens)
+    cards = np.array(tokens).reshape(-1, width)
+    return cards[:, 2:sep].astype(np.int64), cards[:, sep + 1 :].astype(np.int64)
 
 
-def count_matches(winning_nums: set[int], my_nums: Sequence[int]) -> int:
-    """Counts the number of matches in a card."""
-    return len([n for n in my_nums if n in winning_nums])
+def count_matches(winning_nums: np.ndarray, my_nums: np.ndarray) -> np.ndarray:
+    """Counts the number of matches in every card, through a per-card table of
+    the winning numbers (which are all below 100)."""
+    rows = np.arange(len(winning_nums))[:, np.newaxis]
+    is_winning = np.zeros((len(winning_nums), 100), dtype=bool)
+    is_winning[rows, winning_nums] = True
+    return is_winning[rows, my_nums].sum(axis=1)
 
 
 def part_1(file: str) -> int:
@@ -34,37 +33,33 @@ def part_1(file: str) -> int:
     Returns:
         int: Total sum of points.
     """
-    total_points = []
-    with open(file) as f:
-        for line in f.readlines():
-            points = compute_score(*parse_input(line.rstrip()))
-            total_points.append(points)
-    return sum(total_points)
+    matches = count_matches(*read_cards(file))
+    return int(((1 << matches) >> 1).sum())
 
 
 def part_2(file: str) -> int:
     """Computes the final number of scratchcards.
 
+    Each card adds its copies to a range of following cards. These range
+    updates go to a difference array, whose running sum gives the number of
+    extra copies of the current card in a single forward pass.
+
     Args:
         file (str): Path to the puzzle input
 
     Returns:
         int: The final number of scratchcards.
     """
-    with open(file) as f:
-        lines = f.readlines()
-        games = range(1, (N := len(lines)) + 1)
-        values = [1] * N
-        occurrences = dict(zip(games, values))
-
-    for idx, line in enumerate(lines):
-        game_id = idx + 1
-        count = count_matches(*parse_input(line.rstrip()))
-        if count:
-            for k in range(1, count + 1):
-                occurrences[game_id + k] += occurrences[game_id]
-
-    return sum([val for _, val in occurrences.items()])
+    matches = count_matches(*read_cards(file)).tolist()
+    diff = [0] * (len(matches) + max(matches, default=0) + 1)
+    extra, total = 0, 0
+    for idx, count in enumerate(matches):
+        extra += diff[idx]
+        copies = 1 + extra
+        total += copies
+        diff[idx + 1] += copies
+        diff[idx + 1 + count] -= copies
+    return total
 
 
 if __name__ == "__main__":
@@ -1,7 +1,10 @@
 import argparse
+import bisect
 import collections
 from typing import NamedTuple
 
+import numpy as np
+
 
 class Interval(NamedTuple):
     start: int
@@ -40,92 +43,115 @@ def parse_seeds_and_mappings(file: str) -> tuple[list[int], dict]:
     return seeds, mappings
 
 
-def converts_value(value: int, instructions: list[list[int]]) -> int:
-    """Given a value and a list of instructions from a mapping, computes the
-    transformed value."""
-    new_val = None
-    for target, source, offset in instructions:
-        if value >= source and value <= source + offset:
-            new_val = target + (value-source)
-            break
-    if new_val is None:
-        return value
-    else:
-        return new_val
-
-
-def pairwise(seeds):
-    "Iterates over a list taking two-elements at a time with no overlap."
-    a = iter(seeds)
-    return zip(a, a)
-
+class MappingArrays(NamedTuple):
+    """Source ranges [starts[i], ends[i]) of a mapping, sorted by start, and
+    the delta added to the values falling in each of them."""
+    starts: np.ndarray
+    ends: np.ndarray
+    deltas: np.ndarray
 
-def split_interval(
-        input_interval: Interval,
-        instructions: list[list[int]]) -> list[Interval]:
-    """Transforms an interval of integers into a list of intervals that have
-    been mapped according to the instructions given."""
-    to_visit = [input_interval]
-    transformed = []
-    already_treated = collections.defaultdict(set)
 
-    while to_visit:
-        curr_interval = to_visit.pop(0)
-        seed_max, seed_min = curr_interval.end, curr_interval.start
+def mapping_arrays(instructions: list[list[int]]) -> MappingArrays:
+    """Stores the instructions of a mapping as sorted numpy arrays."""
+    target, source, size = np.array(
+        sorted(instructions, key=lambda ins: ins[1]), dtype=np.int64).T
+    return MappingArrays(source, source + size, target - source)
 
-        for idx, (target, source, size) in enumerate(instructions):
-            start, end = source, source + size - 1
 
-            if seed_max < start or end < seed_min:
-                if curr_interval not in already_treated[idx]:
-                    to_visit.append(curr_interval)
-                    already_treated[idx].add(curr_interval)
-                continue
+def converts_values(values: np.ndarray, mapping: MappingArrays) -> np.ndarray:
+    """Given an array of values and a mapping, computes the transformed values,
+    finding the source range of every value by bisection."""
+    idx = np.searchsorted(mapping.starts, values, side="right") - 1
+    inside = (idx >= 0) & (values < mapping.ends[idx])
+    return values + np.where(inside, mapping.deltas[idx], 0)
 
-            elif seed_min < start and seed_max < end:
-                out_interval, in_interval = (
-                    Interval(seed_min, start-1),
-                    Interval(target, target + seed_max - start),
-                )
-                if curr_interval not in already_treated[idx]:
-                    to_visit.append(out_interval)
-                    already_treated[idx].add(out_interval)
-                transformed.append(in_interval)
-                continue
 
-            elif seed_min < start and end < seed_max:
-                out1, in_interval, out2 = (
-                    Interval(seed_min, start-1),
-                    Interval(target, target + end-start),
-                    Interval(end + 1, seed_max),
-                )
-                for out in [out1, out2]:
-                    if out not in already_treated[idx]:
-                        to_visit.append(out)
-                        already_treated[idx].add(out)
-                transformed.append(in_interval)
-                continue
+def seeds_to_locations(seeds: np.ndarray, mappings: dict) -> np.ndarray:
+    """Pushes an array of seeds through all the mappings, in order."""
+    values = np.asarray(seeds, dtype=np.int64)
+    for instructions in mappings.values():
+        values = converts_values(values, mapping_arrays(instructions))
+    return values
 
-            elif start <= seed_min and seed_max <= end:
-                transformed.append(
-                    Interval(target + seed_min-start, target + seed_max-start))
-                continue
 
-            elif start <= seed_min and end < seed_max:
-                in_interval, out_interval = (
-                    Interval(target + seed_min - start, target + end-start),
-                    Interval(end + 1, seed_max),
-                )
-                if out_interval not in already_treated[idx]:
-                    to_visit.append(out_interval)
-                    already_treated[idx].add(out_interval)
-                continue
+def pairwise(seeds):
+    "Iterates over a list taking two-elements at a time with no overlap."
+    a = iter(seeds)
+    return zip(a, a)
 
-        if all([curr_interval in already_treated[idx]
-                for idx in range(len(instructions))]):
-            transformed.append(curr_interval)
 
-    return list(set(transformed))
+class PiecewiseMap(NamedTuple):
+    """Maps x to x + offsets[i] for x in [starts[i], starts[i+1]), the last
+    piece extending to infinity."""
+    starts: list[int]
+    offsets: list[int]
+
+
+def normalize_mapping(instructions: list[list[int]]) -> PiecewiseMap:
+    """Turns the instructions of a mapping into sorted breakpoints with offsets,
+    filling the gaps between source ranges with identity pieces."""
+    starts, offsets = [0], [0]
+    for target, source, size in sorted(instructions, key=lambda ins: ins[1]):
+        if source == starts[-1]:
+            offsets[-1] = target - source
+        else:
+            starts.append(source)
+            offsets.append(target - source)
+        starts.append(source + size)
+        offsets.append(0)
+    return simplify(PiecewiseMap(starts, offsets))
+
+
+def simplify(mapping: PiecewiseMap) -> PiecewiseMap:
+    """Merges consecutive pieces sharing the same offset."""
+    starts, offsets = [], []
+    for start, offset in zip(*mapping):
+        if not offsets or offsets[-1] != offset:
+            starts.append(start)
+            offsets.append(offset)
+    return PiecewiseMap(starts, offsets)
+
+
+def compose(first: PiecewiseMap, second: PiecewiseMap) -> PiecewiseMap:
+    """Computes the piecewise map x -> second(first(x)).
+
+    Each piece of first is split at the breakpoints of second falling within
+    its image, found by bisection."""
+    starts, offsets = [], []
+    ends = first.starts[1:] + [float("inf")]
+    for start, end, offset in zip(first.starts, ends, first.offsets):
+        j = bisect.bisect_right(second.starts, start + offset) - 1
+        pos = start
+        while True:
+            starts.append(pos)
+            offsets.append(offset + second.offsets[j])
+            j += 1
+            if j == len(second.starts) or second.starts[j] >= end + offset:
+                break
+            pos = second.starts[j] - offset
+    return simplify(PiecewiseMap(starts, offsets))
+
+
+def compose_all(mappings: dict) -> PiecewiseMap:
+    """Composes all the mappings, in order, into a single seed to location map."""
+    composed = PiecewiseMap([0], [0])
+    for instructions in mappings.values():
+        composed = compose(composed, normalize_mapping(instructions))
+    return composed
+
+
+def range_minimum(mapping: PiecewiseMap, interval: Interval) -> int:
+    """Computes the minimum image of an interval through a piecewise map.
+
+    The map is increasing on each piece, so only the first value of each piece
+    touched by the interval needs to be looked at."""
+    i = bisect.bisect_right(mapping.starts, interval.start) - 1
+    minimum = interval.start + mapping.offsets[i]
+    for i in range(i + 1, len(mapping.starts)):
+        if mapping.starts[i] > interval.end:
+            break
+        minimum = min(minimum, mapping.starts[i] + mapping.offsets[i])
+    return minimum
 
 
 def part_1(file: str) -> int:
@@ -139,13 +165,7 @@ def part_1(file: str) -> int:
     """
     seeds, mappings = parse_seeds_and_mappings(file)
 
-    locations = []
-    for seed in seeds:
-        val = seed
-        for mapping in mappings:
-            val = converts_value(val, mappings[mapping])
-        locations.append(val)
-    return min(locations)
+    return int(seeds_to_locations(seeds, mappings).min())
 
 
 def part_2(file: str) -> int:
@@ -159,26 +179,49 @@ def part_2(file: str) -> int:
     """
     seeds, mappings = parse_seeds_and_mappings(file)
 
+    location = compose_all(mappings)
+
     per_range_minimums = []
     for seed, nb_seeds in pairwise(seeds):
         input_interval = Interval(seed, seed + nb_seeds - 1)
-        intervals = [input_interval]
-        for _, instructions in mappings.items():
-            tmp_intervals = []
-            for interval in intervals:
-                tmp_intervals.extend(split_interval(interval, instructions))
-            intervals = tmp_intervals
-        per_range_minimums.append(
-            min(interval.start for interval in intervals))
+        per_range_minimums.append(range_minimum(location, input_interval))
     return min(per_range_minimums)
 
 
+def check_range_minimums(
+        file: str, nb_samples: int = 1000, seed: int = 0) -> None:
+    """Validates the range minimums of part 2 against the point lookup of
+    part 1, on seeds sampled uniformly in each range plus its two ends."""
+    seeds, mappings = parse_seeds_and_mappings(file)
+    location = compose_all(mappings)
+    rng = np.random.default_rng(seed)
+    for start, nb_seeds in pairwise(seeds):
+        interval = Interval(start, start + nb_seeds - 1)
+        samples = np.concatenate([
+            [interval.start, interval.end],
+            rng.integers(interval.start, interval.end, nb_samples,
+                         endpoint=True),
+        ])
+        expected = seeds_to_locations(samples, mappings)
+        idx = np.searchsorted(location.starts, samples, side="right") - 1
+        assert (samples + np.array(location.offsets)[idx] == expected).all()
+        assert range_minimum(location, interval) <= expected.min()
+
+
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 5 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Checks part 2 against point lookups on sampled seeds",
+    )
     args = parser.parse_args()
 
+    if args.check:
+        check_range_minimums(file=args.file)
+
     sol1 = part_1(file=args.file)
     sol2 = part_2(file=args.file)
 
@@ -3,67 +3,117 @@ import math
 import numpy as np
 import re
 
+# Races below these bounds are computed exactly in float64 / int64
+MAX_BATCH_TIME = 2**26
+MAX_BATCH_DISTANCE = 2**52
 
-def count_nb_of_wins(time: int, distance: int):
-    """Counts the number of wins beating the record in a particular race."""
-    root1 = time / 2 - (math.sqrt(time**2 - 4 * distance)) / 2
-    mid = time / 2
-    root2 = root1 + 2 * (mid - root1)
-    return math.ceil(root2) - math.floor(root1) - 1
 
-
-def part_1(file: str) -> int:
+def read_races(file: str, kerning: bool = False) -> tuple[list[int], list[int]]:
+    """Reads the times and record distances of the races. With kerning, the
+    digits of each line form a single number."""
+    with open(file) as f:
+        while (line := f.readline()):
+            if kerning:
+                line = line.replace(" ", "")
+            if "Time" in line:
+                times = [int(n) for n in re.findall(r"(\d+)", line)]
+            elif "Distance" in line:
+                distances = [int(n) for n in re.findall(r"(\d+)", line)]
+    return times, distances
+
+
+def count_nb_of_wins(time: int, distance: int) -> int:
+    """Counts the number of wins beating the record in a particular race.
+
+    Holding the button h ms wins if h * (time - h) > distance. The smallest such
+    h is estimated with the exact integer square root of the discriminant and
+    then corrected, so the count is exact for arbitrarily large races."""
+    discriminant = time**2 - 4 * distance
+    if discriminant <= 0:
+        return 0
+    low = (time - math.isqrt(discriminant)) // 2
+    while low <= time // 2 and low * (time - low) <= distance:
+        low += 1
+    while low > 0 and (low - 1) * (time - low + 1) > distance:
+        low -= 1
+    return max(time - 2 * low + 1, 0)
+
+
+def count_nb_of_wins_batch(times: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """Counts the number of wins of a batch of races at once.
+
+    Same computation as count_nb_of_wins in float64, with the boundary
+    corrected in int64. Only exact for races below MAX_BATCH_TIME and
+    MAX_BATCH_DISTANCE."""
+    times = np.asarray(times, dtype=np.int64)
+    distances = np.asarray(distances, dtype=np.int64)
+    discriminant = times.astype(np.float64) ** 2 - 4 * distances
+    root = np.sqrt(np.maximum(discriminant, 0))
+    low = np.floor((times - root) / 2).astype(np.int64)
+    low += low * (times - low) <= distances
+    low -= (low > 0) & ((low - 1) * (times - low + 1) > distances)
+    return np.where(discriminant > 0, np.maximum(times - 2 * low + 1, 0), 0)
+
+
+def count_wins(times: list[int], distances: list[int], check: bool = False) -> list[int]:
+    """Counts the number of wins of every race, using the vectorized path when
+    all races are small enough and the exact one otherwise. With check, both
+    paths are run on small batches and compared."""
+    exact = max(times, default=0) >= MAX_BATCH_TIME or (
+        max(distances, default=0) >= MAX_BATCH_DISTANCE)
+    if exact:
+        return [count_nb_of_wins(t, d) for t, d in zip(times, distances)]
+
+    wins = count_nb_of_wins_batch(times, distances).tolist()
+    if check:
+        expected = [count_nb_of_wins(t, d) for t, d in zip(times, distances)]
+        assert wins == expected, "Batch and exact win counts differ"
+    return wins
+
+
+def part_1(file: str, check: bool = False) -> int:
     """Computes the product of the number of wins from a list of races.
 
     Args:
         file (str): Path to the puzzle input
+        check (bool, optional): Cross-checks the batch path against the
+            exact one. Defaults to False.
 
     Returns:
         int: product of the number of ways to beat each race's record.
     """
-    with open(file) as f:
-        while (line := f.readline()):
-            if "Time" in line:
-                line = line.replace("Time: ", "")
-                times = [int(n) for n in re.findall("(\d+)", line)]
-            elif "Distance" in line:
-                line = line.replace("Distance: ", "")
-                distances = [int(n) for n in re.findall("(\d+)", line)]
-    wins = []
-    for time, distance in zip(times, distances):
-        wins.append(count_nb_of_wins(time, distance))
+    times, distances = read_races(file)
+    return math.prod(count_wins(times, distances, check=check))
 
-    return np.prod(wins)
 
-
-def part_2(file: str) -> int:
+def part_2(file: str, check: bool = False) -> int:
     """Computes the the total number of wins beating the record from a race.
 
     Args:
         file (str): Path to the puzzle input
+        check (bool, optional): Cross-checks the batch path against the
+            exact one. Defaults to False.
 
     Returns:
         int: Number of ways to beat the record in the particular race.
     """
-    with open(file) as f:
-        while (line := f.readline()):
-            if "Time" in line:
-                line = line.replace("Time: ", "").replace(" ", "")
-                time = [int(n) for n in re.findall("(\d+)", line)]
-            elif "Distance" in line:
-                line = line.replace("Distance: ", "").replace(" ", "")
-                distance = [int(n) for n in re.findall("(\d+)", line)]
-    return count_nb_of_wins(*time, *distance)
+    times, distances = read_races(file, kerning=True)
+    return count_wins(times, distances, check=check)[0]
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 6 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Cross-checks the vectorized path against the exact one",
+    )
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    sol1 = part_1(file=args.file, check=args.check)
+    sol2 = part_2(file=args.file, check=args.check)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
@@ -1,50 +1,126 @@
 import argparse
-import collections
-import functools
-
-
-def find_hand(cards: str) -> str:
-    """Returns the string encoding the hand given as input."""
-    set_cards = set(cards)
-    if len(set_cards) == 5:
-        return "single"
-    if len(set_cards) == 4:
-        return "onepair"
-    elif len(set_cards) == 1:
-        return "five"
-    else:
-        freqs = collections.Counter(cards).most_common(1)
-        for _, freq in freqs:
-            match freq:
-                case 2:
-                    return "twopair"
-                case 4:
-                    return "four"
-                case 3 if len(set_cards) == 2:
-                    return "house"
-                case 3 if len(set_cards) == 3:
-                    return "three"
-
-
-def strongest_hand(cards: str, card_values: dict[str, int]) -> str:
-    """Finds the strongest possible hand when containing Jokers."""
-    nb_jokers = cards.count("J")
-    if nb_jokers < 5:
-        other_cards = cards.replace("J", "")
-        most_common = collections.Counter(other_cards).most_common()
-        if len(most_common) > 1:
-            if (val := most_common[0][1]) == most_common[1][1]:
-                frq_cards = [c[0] for c in most_common if c[1] == val]
-                frq_values = [card_values[c] for c in frq_cards]
-                best = frq_cards[frq_values.index(max(frq_values))]
-            else:
-                best = most_common[0][0]
-        else:
-            best = most_common[0][0]
-    else:
-        best = "A"
-    strongest_hand = cards.replace("J", best)
-    return strongest_hand
+
+import numpy as np
+
+CARDS = "23456789TJQKA"
+JOKER_CARDS = "J23456789TQKA"
+# Translation to base-13 digits, in increasing strength
+CARD_DIGITS = str.maketrans(CARDS, "0123456789abc")
+JOKER_DIGITS = str.maketrans(JOKER_CARDS, "0123456789abc")
+
+# Hand types indexed by the sum of the squared sizes of the groups of
+# identical cards, which is also the sum over the cards of their group size
+HAND_TYPES = {
+    5: 0,  # high card
+    7: 1,  # one pair
+    9: 2,  # two pair
+    11: 3,  # three of a kind
+    13: 4,  # full house
+    17: 5,  # four of a kind
+    25: 6,  # five of a kind
+}
+
+
+def hand_key(cards: str, jokers: bool = False) -> int:
+    """Packs the strength of a hand into a single integer.
+
+    The hand type is stored in the highest base-13 digit, followed by the rank
+    of each of the five cards, so comparing keys compares hands. With jokers,
+    the jokers are added to the largest group of identical other cards, which
+    always yields the strongest hand type."""
+    ranks = int(cards.translate(JOKER_DIGITS if jokers else CARD_DIGITS), 13)
+    others = cards.replace("J", "") if jokers else cards
+    sizes = list(map(others.count, others))
+    largest = max(sizes, default=0)
+    nb_jokers = len(cards) - len(others)
+    signature = sum(sizes) - largest**2 + (largest + nb_jokers) ** 2
+    return HAND_TYPES[signature] * len(CARDS) ** 5 + ranks
+
+
+def read_hands(file: str) -> tuple[list[str], np.ndarray]:
+    """Reads the hands and their bids."""
+    hands, bids = [], []
+    with open(file, "r") as f:
+        for line in f:
+            if line.strip():
+                cards, bid = line.split()
+                hands.append(cards)
+                bids.append(int(bid))
+    return hands, np.array(bids, dtype=np.int64)
+
+
+def total_winnings(keys: np.ndarray, bids: np.ndarray) -> int:
+    """Ranks the hands by key and sums each bid multiplied by its rank."""
+    order = np.argsort(keys, kind="stable")
+    ranks = np.arange(1, len(keys) + 1, dtype=np.int64)
+    return int((ranks * bids[order]).sum())
+
+
+class FenwickTree:
+    def __init__(self, size: int):
+        """Binary indexed tree over the positions 0 to size - 1, supporting
+        point additions and prefix sums in O(log size)."""
+        self.tree = [0] * (size + 1)
+
+    def add(self, position: int, value: int) -> None:
+        """Adds value at the given position."""
+        position += 1
+        while position < len(self.tree):
+            self.tree[position] += value
+            position += position & -position
+
+    def prefix_sum(self, position: int) -> int:
+        """Sums the values stored at positions 0 to position, included."""
+        total = 0
+        position += 1
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+
+class Tournament:
+    def __init__(self, jokers: bool = False):
+        """Ranks hands as they are inserted, keeping the total winnings up to
+        date.
+
+        Two Fenwick trees indexed by hand key count the hands and sum their
+        bids. Inserting a hand shifts the rank of every stronger hand by one,
+        which adds the sum of their bids to the total winnings. Hands sharing a
+        key are ranked by insertion order.
+
+        Args:
+            jokers (bool, optional): Whether J cards are jokers. Defaults to
+                False.
+        """
+        self.jokers = jokers
+        size = len(HAND_TYPES) * len(CARDS) ** 5
+        self.counts = FenwickTree(size)
+        self.bids = FenwickTree(size)
+        self.nb_hands = 0
+        self.total_bids = 0
+        self.total_winnings = 0
+
+    def insert(self, cards: str, bid: int) -> int:
+        """Inserts a hand with its bid in O(log n).
+
+        Args:
+            cards (str): The five cards of the hand
+            bid (int): Bid of the hand
+
+        Returns:
+            int: The total winnings after the insertion
+        """
+        key = hand_key(cards, jokers=self.jokers)
+        rank = 1 + self.counts.prefix_sum(key)
+        stronger_bids = self.total_bids - self.bids.prefix_sum(key)
+        self.total_winnings += rank * bid + stronger_bids
+
+        self.counts.add(key, 1)
+        self.bids.add(key, bid)
+        self.nb_hands += 1
+        self.total_bids += bid
+        return self.total_winnings
 
 
 def part_1(file: str) -> int:
@@ -56,110 +132,53 @@ def part_1(file: str) -> int:
     Returns:
         int: Total sum of points.
     """
-    input_cards, bets = [], []
-    # Read file
-    with open(file, "r") as f:
-        for line in f.readlines():
-            cards, bet = line.rstrip().split()
-            input_cards.append(cards)
-            bets.append(int(bet))
-
-    cards = ["A", "K", "Q", "J", "T", "9", "8", "7", "6", "5", "4", "3", "2"]
-    card_values = dict(zip(cards, reversed(range(len(cards)))))
-    hands = ["five", "four", "house", "three", "twopair", "onepair", "single"]
-    hand_values = dict(zip(hands, reversed(range(len(hands)))))
-
-    def compare(elem1: tuple[str, int], elem2: tuple[str, int]) -> int:
-        """Custom function to compare the strength of two cards."""
-        cards1, cards2 = elem1[0], elem2[0]
-        hand1, hand2, = find_hand(cards1), find_hand(cards2)
-        if hand_values[hand1] < hand_values[hand2]:
-            return -1
-        elif hand_values[hand1] > hand_values[hand2]:
-            return 1
-        else:
-            for idx in range(len(cards1)):
-                card1, card2 = cards1[idx], cards2[idx]
-                if card1 == card2:
-                    continue
-                if card_values[card1] < card_values[card2]:
-                    return -1
-                elif card_values[card1] > card_values[card2]:
-                    return 1
-            if idx == len(cards1) - 1:
-                return 0
-
-    sorted_hands = sorted(zip(input_cards, bets),
-                          key=functools.cmp_to_key(compare), reverse=False)
-    total_winnings = sum([(idx + 1) * bet
-                         for idx, (_, bet) in enumerate(sorted_hands)])
-    return total_winnings
+    hands, bids = read_hands(file)
+    keys = np.array([hand_key(cards) for cards in hands], dtype=np.int64)
+    return total_winnings(keys, bids)
 
 
 def part_2(file: str) -> int:
-    """Computes the final number of scratchcards.
+    """Computes the total winnings after sorting the hands, J cards now being
+    jokers.
 
     Args:
         file (str): Path to the puzzle input
 
     Returns:
-        int: The final number of scratchcards.
+        int: Total sum of points.
     """
-    input_cards, bets = [], []
-    # Read file
-    with open(file, "r") as f:
-        for line in f.readlines():
-            cards, bet = line.rstrip().split()
-            input_cards.append(cards)
-            bets.append(int(bet))
-
-    cards = ["A", "K", "Q", "J", "T", "9", "8", "7", "6", "5", "4", "3", "2"]
-    card_values = dict(zip(cards, reversed(range(len(cards)))))
-    hands = ["five", "four", "house", "three", "twopair", "onepair", "single"]
-    hand_values = dict(zip(hands, reversed(range(len(hands)))))
-
-    # Updates value for Joker
-    card_values["J"] = -1
-
-    def compare_with_jokers(
-            elem1: tuple[str, int], elem2: tuple[str, int]) -> int:
-        """Custom function to compare the strength of two cards."""
-        cards1, cards2 = elem1[0], elem2[0]
-        hand1 = find_hand(strongest_hand(
-            cards1, card_values)) if "J" in cards1 else find_hand(cards1)
-        hand2 = find_hand(strongest_hand(
-            cards2, card_values)) if "J" in cards2 else find_hand(cards2)
-        if hand_values[hand1] < hand_values[hand2]:
-            return -1
-        elif hand_values[hand1] > hand_values[hand2]:
-            return 1
-        else:
-            for idx in range(len(cards1)):
-                card1, card2 = cards1[idx], cards2[idx]
-                if card1 == card2:
-                    continue
-                if card_values[card1] < card_values[card2]:
-                    return -1
-                elif card_values[card1] > card_values[card2]:
-                    return 1
-            if idx == len(cards1)-1:
-                return 0
-
-    sorted_hands = sorted(zip(input_cards, bets), key=functools.cmp_to_key(
-        compare_with_jokers), reverse=False)
-
-    total_winnings = sum([(idx + 1) * bet
-                         for idx, (_, bet) in enumerate(sorted_hands)])
-
-    return total_winnings
+    hands, bids = read_hands(file)
+    keys = np.array([hand_key(cards, jokers=True) for cards in hands], dtype=np.int64)
+    return total_winnings(keys, bids)
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 7 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Streams the hands and prints the winnings after each batch",
+    )
     args = parser.parse_args()
 
+    if args.batch_size:
+        hands, bids = read_hands(args.file)
+        standard, joker = Tournament(), Tournament(jokers=True)
+        for start in range(0, len(hands), args.batch_size):
+            for cards, bid in zip(
+                hands[start : start + args.batch_size],
+                bids[start : start + args.batch_size].tolist(),
+            ):
+                standard.insert(cards, bid)
+                joker.insert(cards, bid)
+            print(
+                f"{standard.nb_hands} hands: {standard.total_winnings} "
+                f"(with jokers: {joker.total_winnings})"
+            )
+
     sol1 = part_1(file=args.file)
     sol2 = part_2(file=args.file)
 
@@ -1,23 +1,220 @@
 import argparse
+import concurrent.futures
+import functools
 import math
 import re
+from typing import NamedTuple
 
+import numpy as np
 
-def nb_steps_until_condition(
-        node: str,
-        node_to_children: dict[str, dict[str, str]],
-        steps_to_perform: list[str],
-        condition: callable) -> int:
-    """Counts the number of steps needed to go from node until matching the
-    given condition."""
-    idx, found = 0, False
-    while not found:
-        direction = steps_to_perform[idx % len(steps_to_perform)]
-        node = node_to_children[node][direction]
-        if condition(node):
-            found = True
-        idx += 1
-    return idx
+# Below this many ghosts, starting a process pool costs more than it saves
+MIN_PARALLEL_GHOSTS = 8
+
+
+class Network:
+    def __init__(self, file: str):
+        """Loads the network with nodes interned to integers.
+
+        The children of node i are left[i] and right[i]. Following the whole
+        instruction string once is precomposed into a single mapping, cycle,
+        and jumps[k] applies it 2**k times (binary lifting), so long walks
+        take a logarithmic number of table lookups.
+
+        Args:
+            file (str): Path to the puzzle input
+        """
+        pattern = re.compile(r'(\w+) = \((\w+), (\w+)\)')
+        with open(file) as f:
+            self.instructions = f.readline().rstrip()
+            edges = pattern.findall(f.read())
+
+        self.names = [parent for parent, _, _ in edges]
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.left = np.array([self.index[left] for _, left, _ in edges])
+        self.right = np.array([self.index[right] for _, _, right in edges])
+        self.children = {"L": self.left, "R": self.right}
+
+        nodes = np.arange(len(self.names))
+        self.cycle = nodes
+        for direction in self.instructions:
+            self.cycle = self.children[direction][self.cycle]
+
+        # A walk repeats itself after at most one cycle per node
+        self.jumps = [self.cycle]
+        for _ in range(len(self.names).bit_length()):
+            self.jumps.append(self.jumps[-1][self.jumps[-1]])
+
+    def walk(self, node: int, nb_steps: int) -> int:
+        """Returns the node reached after nb_steps steps from node."""
+        nb_cycles, tail = divmod(nb_steps, len(self.instructions))
+        for k in range(nb_cycles.bit_length()):
+            if nb_cycles >> k & 1:
+                while k >= len(self.jumps):
+                    # Only the levels needed by first_hits are built upfront
+                    self.jumps.append(self.jumps[-1][self.jumps[-1]])
+                node = self.jumps[k][node]
+        for direction in self.instructions[:tail]:
+            node = self.children[direction][node]
+        return int(node)
+
+    def first_hits(self, nodes: np.ndarray, goal: np.ndarray) -> np.ndarray:
+        """Counts the number of steps needed to go from each of the nodes until
+        reaching a goal node.
+
+        Args:
+            nodes (np.ndarray): Starting nodes
+            goal (np.ndarray): Boolean mask of the goal nodes
+
+        Returns:
+            np.ndarray: Number of steps for each starting node, -1 if it never
+                reaches the goal
+        """
+        # First step within one cycle at which each node reaches the goal
+        offset = np.full(len(self.names), -1)
+        position = np.arange(len(self.names))
+        for step, direction in enumerate(self.instructions, start=1):
+            position = self.children[direction][position]
+            offset[(offset == -1) & goal[position]] = step
+
+        # hits[k] tells whether the goal is reached within 2**k cycles
+        hits = [offset != -1]
+        for jump in self.jumps[:-1]:
+            hits.append(hits[-1] | hits[-1][jump])
+
+        # Skips the largest number of cycles without any goal node
+        nodes = np.asarray(nodes)
+        nb_cycles = np.zeros(len(nodes), dtype=np.int64)
+        for k in reversed(range(len(self.jumps))):
+            skip = ~hits[k][nodes]
+            nodes = np.where(skip, self.jumps[k][nodes], nodes)
+            nb_cycles += np.where(skip, 2**k, 0)
+        steps = nb_cycles * len(self.instructions) + offset[nodes]
+        return np.where(offset[nodes] == -1, -1, steps)
+
+    def goal_offsets(self, goal: np.ndarray) -> list[list[int]]:
+        """Lists, for each node, the steps within one cycle at which a walk
+        starting from it is on a goal node."""
+        positions = np.empty((len(self.instructions), len(self.names)), dtype=np.int64)
+        position = np.arange(len(self.names))
+        for step, direction in enumerate(self.instructions):
+            position = self.children[direction][position]
+            positions[step] = position
+        offsets = [[] for _ in self.names]
+        for step, node in zip(*np.nonzero(goal[positions])):
+            offsets[node].append(int(step) + 1)
+        return offsets
+
+    def mask(self, condition: callable) -> np.ndarray:
+        """Boolean mask of the nodes whose name matches the condition."""
+        return np.array([condition(name) for name in self.names])
+
+
+class Ghost(NamedTuple):
+    """Steps at which a ghost is on a goal node: the steps in tail_hits, then
+    from step start onwards every step congruent to one of the residues modulo
+    period."""
+    tail_hits: list[int]
+    start: int
+    period: int
+    residues: set[int]
+
+    def is_hit(self, step: int) -> bool:
+        if step < self.start:
+            return step in self.tail_hits
+        return step % self.period in self.residues
+
+
+def analyze_ghost(
+    cycle: np.ndarray, L: int, offsets: list[list[int]], node: int
+) -> Ghost:
+    """Finds the tail, the cycle and the goal steps of a walk from node.
+
+    The state of a walk is its node and its position in the instructions. At
+    cycle boundaries that position is 0, so the walk is periodic as soon as a
+    node repeats at a boundary.
+
+    Args:
+        cycle (np.ndarray): Node reached from each node after one cycle
+        L (int): Number of instructions in one cycle
+        offsets (list[list[int]]): Goal steps within one cycle of each node
+        node (int): Starting node
+
+    Returns:
+        Ghost: Goal steps of the walk
+    """
+    seen, boundaries = {}, []
+    while node not in seen:
+        seen[node] = len(boundaries)
+        boundaries.append(node)
+        node = int(cycle[node])
+    tail = seen[node]
+
+    hits = [c * L + t for c, node in enumerate(boundaries) for t in offsets[node]]
+    period = (len(boundaries) - tail) * L
+    return Ghost(
+        tail_hits=[s for s in hits if s <= tail * L],
+        start=tail * L + 1,
+        period=period,
+        residues={s % period for s in hits if s > tail * L},
+    )
+
+
+# Tables shared by the ghost analyses of a worker process, set once by
+# init_worker so that each task only ships its starting node
+_worker_analyze = None
+
+
+def init_worker(cycle: np.ndarray, L: int, offsets: list[list[int]]) -> None:
+    """Stores the tables needed by analyze_ghost in a worker process."""
+    global _worker_analyze
+    _worker_analyze = functools.partial(analyze_ghost, cycle, L, offsets)
+
+
+def analyze_in_worker(node: int) -> Ghost:
+    """Analyzes the ghost starting from node with the worker's tables."""
+    return _worker_analyze(node)
+
+
+def crt(a1: int, m1: int, a2: int, m2: int) -> int:
+    """Solves x = a1 mod m1 and x = a2 mod m2 for moduli that may not be
+    coprime. Returns x modulo lcm(m1, m2), or None if there is no solution."""
+    g = math.gcd(m1, m2)
+    if (a2 - a1) % g:
+        return None
+    k = (a2 - a1) // g * pow(m1 // g, -1, m2 // g) % (m2 // g)
+    return (a1 + k * m1) % math.lcm(m1, m2)
+
+
+def earliest_sync(ghosts: list[Ghost]) -> int:
+    """Computes the first step at which all the ghosts are on goal nodes.
+
+    Steps before every ghost has entered its cycle are checked one by one
+    among the goal steps of the ghost with the longest tail. Later steps are
+    found by combining the residues of all ghosts with the generalized CRT.
+
+    Args:
+        ghosts (list[Ghost]): Goal steps of each ghost
+
+    Returns:
+        int: The first synchronized step, -1 if there is none
+    """
+    longest = max(ghosts, key=lambda ghost: ghost.start)
+    for step in longest.tail_hits:
+        if all(ghost.is_hit(step) for ghost in ghosts):
+            return step
+
+    residues, modulus = {0}, 1
+    for ghost in ghosts:
+        residues = {
+            x
+            for a in residues
+            for b in ghost.residues
+            if (x := crt(a, modulus, b, ghost.period)) is not None
+        }
+        modulus = math.lcm(modulus, ghost.period)
+    if not residues:
+        return -1
+    return min(longest.start + (r - longest.start) % modulus for r in residues)
 
 
 def part_1(file: str) -> int:
@@ -29,67 +226,52 @@ def part_1(file: str) -> int:
     Returns:
         int: Total number of steps needed.
     """
-    # Parse input
-    pattern = re.compile(r'(\w+) = \((\w+), (\w+)\)')
-    node_to_children = {}
-    with open(file) as f:
-        for idx, line in enumerate(f.readlines()):
-            if not idx:
-                steps_to_perform = list(line.rstrip())
-            else:
-                match = pattern.match(line.rstrip())
-                if match:
-                    parent, left, right = match.groups()
-                    node_to_children[parent] = {'L': left, 'R': right}
-
-    start_node = "AAA"
-    def condition(node: str) -> bool: return node == "ZZZ"
-    nb_steps = nb_steps_until_condition(
-        start_node, node_to_children, steps_to_perform, condition)
-    return nb_steps
-
-
-def part_2(file: str) -> int:
+    network = Network(file)
+    start_node = network.index["AAA"]
+    goal = network.mask(lambda node: node == "ZZZ")
+    return int(network.first_hits([start_node], goal)[0])
+
+
+def part_2(file: str, workers: int = None) -> int:
     """Computes the number of steps needed for all starting nodes to visit at
     the same time nodes having 'Z' as a final character.
 
     Args:
         file (str): Path to the puzzle input
+        workers (int, optional): Number of processes analyzing the ghosts, 1
+            to stay in the current process. Defaults to the number of CPUs,
+            with fewer than MIN_PARALLEL_GHOSTS ghosts analyzed in-process.
 
     Returns:
         int: The minimal number of steps needed.
     """
-    # Parse input
-    pattern = re.compile(r'(\w+) = \((\w+), (\w+)\)')
-    node_to_children = {}
-    with open(file) as f:
-        for idx, line in enumerate(f.readlines()):
-            if not idx:
-                steps_to_perform = list(line.rstrip())
-            else:
-                match = pattern.match(line.rstrip())
-                if match:
-                    parent, left, right = match.groups()
-                    node_to_children[parent] = {'L': left, 'R': right}
-
-    start_nodes = [node for node in node_to_children if node[-1] == "A"]
-    def condition(node: str) -> bool: return node[-1] == "Z"
-    lengths = []
-    for node in start_nodes:
-        lengths.append(nb_steps_until_condition(
-            node, node_to_children, steps_to_perform, condition))
-
-    return math.lcm(*lengths)
+    network = Network(file)
+    start_nodes = np.flatnonzero(network.mask(lambda node: node[-1] == "A"))
+    offsets = network.goal_offsets(network.mask(lambda node: node[-1] == "Z"))
+
+    tables = (network.cycle, len(network.instructions), offsets)
+    if workers == 1 or len(start_nodes) < MIN_PARALLEL_GHOSTS:
+        analyze = functools.partial(analyze_ghost, *tables)
+        ghosts = list(map(analyze, start_nodes.tolist()))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+            workers, initializer=init_worker, initargs=tables
+        ) as executor:
+            ghosts = list(executor.map(analyze_in_worker, start_nodes.tolist()))
+    return earliest_sync(ghosts)
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 8 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes analyzing the ghosts"
+    )
     args = parser.parse_args()
 
     sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    sol2 = part_2(file=args.file, workers=args.workers)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
@@ -1,28 +1,128 @@
 import argparse
+import collections
+import concurrent.futures
+import functools
+import math
+from typing import Iterator
 
 import numpy as np
 
 
-def predict_forward_value(row: np.ndarray) -> int:
-    """Predicts next value in a time series."""
-    vals = [row[-1]]
-    while np.sum(np.abs(row)):
-        delta = row[1:] - row[:-1]
-        row = delta
-        vals.append(delta[-1])
-    return sum(vals)
+def iter_batches(file: str, batch_size: int = 10000) -> Iterator[dict[int, np.ndarray]]:
+    """Reads the time series lazily, yielding batches of at most batch_size
+    series in which the ones of equal length are stacked into one matrix."""
+    batch, nb_rows = collections.defaultdict(list), 0
+    with open(file) as f:
+        for line in f:
+            if line.strip():
+                row = [int(n) for n in line.split()]
+                batch[len(row)].append(row)
+                nb_rows += 1
+            if nb_rows == batch_size:
+                yield {length: np.array(rows) for length, rows in batch.items()}
+                batch, nb_rows = collections.defaultdict(list), 0
+    if nb_rows:
+        yield {length: np.array(rows) for length, rows in batch.items()}
+
+
+@functools.cache
+def extrapolation_coefficients(length: int) -> np.ndarray:
+    """Computes the coefficients giving the next and previous values of a time
+    series of the given length as combinations of its values.
+
+    A series of degree below its length has a zero length-th difference:
+    sum_k (-1)**(length - k) * C(length, k) * x_k = 0. Solving for the value
+    after the last one and for the value before the first one gives signed
+    binomial coefficients.
+
+    Args:
+        length (int): Length of the time series
+
+    Returns:
+        np.ndarray: (length x 2) array of Python ints, whose first column
+            predicts forward and second column backwards.
+    """
+    coefs = np.empty((length, 2), dtype=object)
+    for k in range(length):
+        coefs[k, 0] = (-1) ** (length - k + 1) * math.comb(length, k)
+        coefs[k, 1] = (-1) ** k * math.comb(length, k + 1)
+    return coefs
+
+
+def extrapolate(rows: np.ndarray) -> np.ndarray:
+    """Predicts the next and previous values of equal-length time series with a
+    single matrix product.
+
+    The product is done in int64 when it cannot overflow, i.e. when the largest
+    absolute value times the sum of the absolute coefficients (2**length)
+    stays below 2**63, and with exact Python ints otherwise.
+
+    Args:
+        rows (np.ndarray): (series x length) array of time series
+
+    Returns:
+        np.ndarray: (series x 2) array of the next and previous values
+    """
+    length = rows.shape[1]
+    coefs = extrapolation_coefficients(length)
+    largest = max(abs(int(rows.max())), abs(int(rows.min())))
+    if largest < 2 ** (63 - length):
+        return rows.astype(np.int64) @ coefs.astype(np.int64)
+    return rows.astype(object) @ coefs
 
 
-def predict_backwards_value(row: np.ndarray) -> int:
-    """Predicts previous value in a time series."""
-    vals = [row[0]]
-    sign = -1
-    while np.sum(np.abs(row)):
-        delta = row[1:] - row[:-1]
-        row = delta
-        vals.append(sign * delta[0])
-        sign *= -1
-    return np.sum(vals)
+def predict_batch(batch: dict[int, np.ndarray]) -> tuple[int, int]:
+    """Sums the forward and backward predictions of a batch of time series."""
+    forward, backward = 0, 0
+    for rows in batch.values():
+        predictions = extrapolate(rows)
+        # Accumulated as Python ints, which cannot wrap around
+        forward += sum(predictions[:, 0].tolist())
+        backward += sum(predictions[:, 1].tolist())
+    return forward, backward
+
+
+def predict_sums(
+        file: str, batch_size: int = 10000, workers: int = None) -> tuple[int, int]:
+    """Sums the forward and backward predictions in a single pass over the file.
+
+    Only one batch is held in memory at a time, or a couple of batches per
+    worker when the predictions are spread over a process pool.
+
+    Args:
+        file (str): Path to the puzzle input
+        batch_size (int, optional): Number of series per batch. Defaults to
+            10000.
+        workers (int, optional): Number of processes doing the predictions,
+            None to stay in the current process. Defaults to None.
+
+    Returns:
+        tuple[int, int]: Sums of the forward and of the backward predictions
+    """
+    batches = iter_batches(file, batch_size)
+    if workers is None:
+        results = map(predict_batch, batches)
+    else:
+        results = bounded_map(predict_batch, batches, workers)
+
+    forward, backward = 0, 0
+    for batch_forward, batch_backward in results:
+        forward += batch_forward
+        backward += batch_backward
+    return forward, backward
+
+
+def bounded_map(fn: callable, items: Iterator, workers: int) -> Iterator:
+    """Maps fn over items in a process pool, in order, without submitting more
+    than two items per worker ahead of the results consumed."""
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        pending = collections.deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
 def part_1(file: str) -> int:
@@ -34,16 +134,7 @@ def part_1(file: str) -> int:
     Returns:
         int: Sum of the predicted values.
     """
-    history = []
-    with open(file) as f:
-        for line in f.readlines():
-            history.append(np.array([int(n) for n in line.rstrip().split()]))
-
-    preds = []
-    for row in history:
-        pred = predict_forward_value(row)
-        preds.append(pred)
-    return sum(preds)
+    return predict_sums(file)[0]
 
 
 def part_2(file: str) -> int:
@@ -55,26 +146,25 @@ def part_2(file: str) -> int:
     Returns:
         int: Sum of the predicted values.
     """
-    history = []
-    with open(file) as f:
-        for line in f.readlines():
-            history.append(np.array([int(n) for n in line.rstrip().split()]))
-
-    preds = []
-    for row in history:
-        pred = predict_backwards_value(row)
-        preds.append(pred)
-    return sum(preds)
+    return predict_sums(file)[1]
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves Day 9 puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--batch-size", type=int, default=10000, help="Number of series per batch"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes doing the predictions"
+    )
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    # Both parts are computed in a single pass over the file
+    sol1, sol2 = predict_sums(
+        file=args.file, batch_size=args.batch_size, workers=args.workers
+    )
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
@@ -1,21 +1,36 @@
 import argparse
-import collections
 
 import numpy as np
 
+
+def load_lists(file: str) -> tuple[np.ndarray, np.ndarray]:
+    """Parses the two columns straight into int64, without Python strings."""
+    lists = np.fromfile(file, dtype=np.int64, sep=" ").reshape(-1, 2)
+    return lists[:, 0], lists[:, 1]
+
+
+def distance(left: np.ndarray, right: np.ndarray) -> int:
+    return int(np.abs(np.sort(left) - np.sort(right)).sum())
+
+
+def similarity(left: np.ndarray, right: np.ndarray) -> int:
+    values, counts = np.unique(right, return_counts=True)
+    idx = np.searchsorted(values, left).clip(max=len(values) - 1)
+    occurrences = np.where(values[idx] == left, counts[idx], 0)
+    return int((occurrences * left).sum())
+
+
 def part_1(file: str) -> int:
-    lists = np.loadtxt(file, dtype=str).astype(int)
-    return np.abs(np.sort(lists[:, 0]) - np.sort(lists[:, 1])).sum()
+    return distance(*load_lists(file))
 
-def part_2(file: str) -> int:
-    lists = np.loadtxt(file, dtype=str).astype(int)
-    left, rigth = lists[:, 0], lists[:, 1]
-    rigth_ocurrences = collections.Counter(rigth)
-    compute_sim = np.vectorize(lambda x: rigth_ocurrences[x])
-    return (compute_sim(left) * left).sum()
 
+def part_2(file: str) -> int:
+    return similarity(*load_lists(file))
 
 
+def solve(file: str) -> tuple[int, int]:
+    left, right = load_lists(file)
+    return distance(left, right), similarity(left, right)
 
 
 if __name__ == "__main__":
@@ -24,8 +39,7 @@ if __name__ == "__main__":
     parser.add_argument("--file", type=str, help="Path to puzzle file")
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    sol1, sol2 = solve(file=args.file)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
@@ -1,43 +1,60 @@
 import argparse
 
 import numpy as np
-import pandas as pd
 
 
-def are_same_sign(row):
-    # Ignore NaN values
-    row = row.dropna()
-    return np.all(row > 0) or np.all(row < 0)
+def load_reports(file: str) -> np.ndarray:
+    """Loads the reports into a 2D array, padding the shorter ones with NaN."""
+    with open(file) as f:
+        reports = [line.split() for line in f if line.strip()]
+    data = np.full((len(reports), max(map(len, reports))), np.nan)
+    for i, report in enumerate(reports):
+        data[i, : len(report)] = report
+    return data
 
 
-def range_is_ok(row):
-    # Ignore NaN values
-    row = row.dropna()
-    return np.abs(row).max() <= 3 and np.abs(row).min() >= 1
+def steps_are_ok(diffs: np.ndarray) -> np.ndarray:
+    # Steps involving padding are ignored
+    return np.isnan(diffs) | ((diffs >= 1) & (diffs <= 3))
 
 
-def remove_one_and_check(row):
-    row = row.dropna().tolist()
-    for i in range(len(row)):
-        new_row = pd.Series(row[:i] + row[i+1:])
-        new_row = new_row.diff()
-        if are_same_sign(new_row) and range_is_ok(new_row):
-            return True
-    return False
+def is_safe(data: np.ndarray) -> np.ndarray:
+    diffs = np.diff(data, axis=1)
+    return steps_are_ok(diffs).all(axis=1) | steps_are_ok(-diffs).all(axis=1)
+
+
+def is_increasing_after_removing_one(data: np.ndarray) -> np.ndarray:
+    """A report stays increasing without level i if the levels before i are
+    increasing, the levels after i are increasing, and the step from level i-1
+    to level i+1 is ok. Prefix and suffix checks are cumulative ANDs, so each
+    report is handled in O(L)."""
+    N, L = data.shape
+    ok = steps_are_ok(np.diff(data, axis=1))
+    ones = np.ones((N, 1), dtype=bool)
+
+    # Whether levels 0..i-1, respectively i+1..L-1, keep increasing
+    prefix = np.logical_and.accumulate(ok, axis=1)
+    suffix = np.logical_and.accumulate(ok[:, ::-1], axis=1)[:, ::-1]
+    before = np.hstack([ones, ones, prefix[:, :-1]])
+    after = np.hstack([suffix[:, 1:], ones, ones])
+    bridge = np.hstack([ones, steps_are_ok(data[:, 2:] - data[:, :-2]), ones])
+
+    removable = before & after & bridge & ~np.isnan(data)
+    return removable.any(axis=1)
 
 
 def part_1(file: str) -> int:
-    data = pd.read_csv(file, sep=" ", names=[str(i) for i in range(8)])
-    diff = data.diff(axis=1)
-    data["same_sign"] = diff.apply(are_same_sign, axis=1)
-    data['range_is_ok'] = diff.apply(range_is_ok, axis=1)
-    return len(data[data['same_sign'] & data['range_is_ok']])
+    data = load_reports(file)
+    return int(is_safe(data).sum())
 
 
 def part_2(file: str) -> int:
-    data = pd.read_csv(file, sep=" ", names=[str(i) for i in range(8)])
-    data['tolerated'] = data.apply(remove_one_and_check, axis=1)
-    return len(data[data['tolerated']])
+    data = load_reports(file)
+    tolerated = (
+        is_increasing_after_removing_one(data)
+        | is_increasing_after_removing_one(-data)
+    )
+    return int(tolerated.sum())
 
 
 if __name__ == "__main__":
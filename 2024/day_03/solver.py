@@ -1,29 +1,53 @@
 import argparse
 import re
 
+PATTERN = re.compile(rb"mul\((\d{1,3}),(\d{1,3})\)|(do\(\))|(don't\(\))")
+# Longest instruction, "mul(123,456)"
+MAX_TOKEN = 12
+
+
+def scan(file: str, chunk_size: int = 1 << 20) -> tuple[int, int]:
+    """Sums the multiplications in a single pass over fixed-size chunks.
+
+    Returns the sum of all multiplications and the sum of the enabled ones.
+    The last MAX_TOKEN - 1 bytes of a chunk may hold the beginning of an
+    instruction, so they are carried over to the next chunk unless a match
+    already covers them. The do()/don't() state is also carried over.
+    """
+    total, enabled_total, enabled = 0, 0, True
+    carry = b""
+    with open(file, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            last_chunk = not chunk
+            # Lines are joined, as instructions may span line breaks
+            buffer = carry + chunk.replace(b"\n", b"")
+            cut = len(buffer) if last_chunk else len(buffer) - (MAX_TOKEN - 1)
+            end = 0
+            for match in PATTERN.finditer(buffer):
+                if match.start() >= cut:
+                    break
+                a, b, do, dont = match.groups()
+                if do:
+                    enabled = True
+                elif dont:
+                    enabled = False
+                else:
+                    product = int(a) * int(b)
+                    total += product
+                    enabled_total += product * enabled
+                end = match.end()
+            if last_chunk:
+                return total, enabled_total
+            carry = buffer[max(cut, end):]
+
 
 def part_1(file: str) -> int:
-    with open(file, 'r') as f:
-        instructions = "".join(line.strip() for line in f.readlines())
-    pattern = r"mul\((\d+),(\d+)\)"
-    return sum(int(a) * int(b) for a, b in re.findall(pattern, instructions))
+    return scan(file)[0]
 
 
 def part_2(file: str) -> int:
-    with open(file, 'r') as f:
-        instructions = "".join(line.strip() for line in f.readlines())
-    pattern = r"mul\((\d+),(\d+)\)"
-    to_remove = [(m.start(), m.end())
-                 for m in re.finditer(r"don't\(\)(.*?)do\(\)", instructions)]
-    start = 0
-    new_instructions = ""
-    for i, j in to_remove:
-        end = i
-        new_instructions += instructions[start:end]
-        start = j
-    new_instructions += instructions[start:]
-    return sum(int(a) * int(b) for a, b in
-               re.findall(pattern, new_instructions))
+    return scan(file)[1]
 
 
 if __name__ == "__main__":
@@ -32,8 +56,8 @@ if __name__ == "__main__":
     parser.add_argument("--file", type=str, help="Path to puzzle file")
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    # Both parts are computed in a single pass over the file
+    sol1, sol2 = scan(file=args.file)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")
@@ -2,90 +2,149 @@ import argparse
 
 import numpy as np
 
+DIRECTIONS = [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
 
-def find_letters_in_neighborhood(data, x, y, letter):
-    """Find all neighbors of a given letter at x, y"""
-    steps = (-1, 0, 1)
-    deltas = [(x, y) for x in steps for y in steps if (x, y) != (0, 0)]
-    matches = []
-    for dx, dy in deltas:
-        if data[x+dx, y+dy] == letter:
-            matches.append((dx, dy))
-    return matches
 
+def load_grid(file: str) -> np.ndarray:
+    """Loads the word search as a uint8 array of letters."""
+    with open(file, "rb") as f:
+        lines = f.read().split()
+    return np.frombuffer(b"".join(lines), dtype=np.uint8).reshape(len(lines), -1)
 
-def count_xmas(data, x, y):
-    """Count the number of XMAS sequences starting at x, y"""
-    count = 0
-    deltas = find_letters_in_neighborhood(data, x, y, "M")
-    for dx, dy in deltas:
-        values = []
-        for i in range(4):
-            values.append(data[x+i*dx, y+i*dy])
-        if "".join(values) == "XMAS":
-            count += 1
-    return count
+
+def shifted(padded: np.ndarray, pad: int, dx: int, dy: int) -> np.ndarray:
+    """View of the padded grid where entry (x, y) holds letter (x+dx, y+dy)."""
+    N, M = padded.shape[0] - 2 * pad, padded.shape[1] - 2 * pad
+    return padded[pad + dx : pad + dx + N, pad + dy : pad + dy + M]
 
 
-def part_1(file: str) -> int:
-    data = np.loadtxt(file, dtype=str)
-    data = np.array([list(row) for row in data])
-    data = np.pad(data, 3, constant_values=".")
-    x_idx = np.where(data == "X")
+def count_word(grid: np.ndarray, word: str) -> int:
+    """Count the occurrences of word in all 8 directions, by ANDing, for each
+    direction, the equality masks of the grid shifted once per letter. A single
+    letter reads the same in every direction, so it is only counted once."""
+    pad = len(word) - 1
+    padded = np.pad(grid, pad)
     count = 0
-    for x, y in zip(*x_idx):
-        count += count_xmas(data, x, y)
+    for dx, dy in DIRECTIONS if len(word) > 1 else DIRECTIONS[:1]:
+        found = np.ones(grid.shape, dtype=bool)
+        for i, letter in enumerate(word.encode()):
+            found &= shifted(padded, pad, i * dx, i * dy) == letter
+        count += int(found.sum())
     return count
 
 
-def create_kernels():
-    """Create all possible X-MAS 3x3 blocks."""
-    def antidiag(a):
-        return np.fliplr(np.diag(a))
-    diag_fn, antidiag_fn = np.diag, antidiag
-    diags = [list(range(2, 5)), list(range(4, 1, -1))]
-    kernels = []
-    for diag1 in diags:
-        for diag2 in diags:
-            arr1, arr2 = diag_fn(diag1), antidiag_fn(diag2)
-            result = np.where(arr1 != 0, arr1, arr2)
-            result = np.where(result == 0, np.nan, result)
-            kernels.append(result)
-    return kernels
-
-
-def A_belongs_to_x_mas(data, x, y):
-    """Returns 1 if 'A' belongs to X-MAS, 0 otherwise."""
-    kernels = create_kernels()
-    submatrix = data[x-1:x+2, y-1:y+2]
-    for kernel in kernels:
-        mask = ~np.isnan(kernel)
-        if np.all(submatrix[mask] == kernel[mask]):
-            return 1
-    return 0
+def count_x_mas(grid: np.ndarray) -> int:
+    """Count the 'A' whose two diagonals both read 'MAS' in either order."""
+    padded = np.pad(grid, 1)
+    M, S = ord("M"), ord("S")
+
+    def is_mas(first, second):
+        return ((first == M) & (second == S)) | ((first == S) & (second == M))
+
+    up_left, down_right = shifted(padded, 1, -1, -1), shifted(padded, 1, 1, 1)
+    up_right, down_left = shifted(padded, 1, -1, 1), shifted(padded, 1, 1, -1)
+    x_mas = (
+        (grid == ord("A"))
+        & is_mas(up_left, down_right)
+        & is_mas(up_right, down_left)
+    )
+    return int(x_mas.sum())
+
+
+class WordSearch:
+    def __init__(self, grid: np.ndarray):
+        """Index over a letter grid answering batches of word queries.
+
+        The grid is indexed once: for every letter, the flat positions where it
+        appears with their row and column. The row and column give, for each
+        direction, how many cells remain before the border, so a word only
+        starts from positions of its first letter leaving enough room.
+        """
+        self.grid = grid.ravel()
+        self.shape = grid.shape
+        self.index = {}
+        for letter in np.unique(self.grid):
+            positions = np.flatnonzero(self.grid == letter)
+            rows, cols = np.divmod(positions, grid.shape[1])
+            self.index[int(letter)] = (positions, rows, cols)
+
+    def room(self, rows: np.ndarray, cols: np.ndarray, dx: int, dy: int) -> np.ndarray:
+        """Number of steps that can be taken in direction (dx, dy) from each
+        cell before leaving the grid."""
+        N, M = self.shape
+        room_x = {-1: rows, 0: np.full_like(rows, max(N, M)), 1: N - 1 - rows}[dx]
+        room_y = {-1: cols, 0: np.full_like(cols, max(N, M)), 1: M - 1 - cols}[dy]
+        return np.minimum(room_x, room_y)
+
+    def count(self, words: list[str]) -> dict[str, int]:
+        """Counts the occurrences of each word in all 8 directions.
+
+        Words are merged in a trie, so in each direction the candidate starts
+        shared by words with a common prefix are filtered only once. The work
+        is proportional to the number of candidates, not to the grid size.
+        """
+        trie = {}
+        for word in words:
+            node = trie
+            for letter in word.encode():
+                node = node.setdefault(letter, {})
+            node[None] = word
+
+        counts = dict.fromkeys(words, 0)
+        for first, child in trie.items():
+            if first not in self.index:
+                continue
+            positions, rows, cols = self.index[first]
+            for dx, dy in DIRECTIONS:
+                room = self.room(rows, cols, dx, dy)
+                stack = [(child, positions, room, 1)]
+                while stack:
+                    node, candidates, room, depth = stack.pop()
+                    for letter, next_node in node.items():
+                        if letter is None:
+                            counts[next_node] += len(candidates)
+                            continue
+                        keep = room >= depth
+                        kept, kept_room = candidates[keep], room[keep]
+                        ahead = kept + depth * (dx * self.shape[1] + dy)
+                        match = self.grid[ahead] == letter
+                        stack.append(
+                            (next_node, kept[match], kept_room[match], depth + 1)
+                        )
+
+        # Single letters were counted once per direction
+        for word in counts:
+            if len(word) == 1:
+                counts[word] //= len(DIRECTIONS)
+        return counts
+
+
+def part_1(file: str, word: str = "XMAS") -> int:
+    return count_word(load_grid(file), word)
 
 
 def part_2(file: str) -> int:
-    data = np.loadtxt(file, dtype=str)
-    data = np.array([list(row) for row in data])
-    data = np.pad(data, 3, constant_values=".")
-    str2float = dict(zip("XMAS", range(1, 5)))
-    str2float |= {".": np.nan}
-    data = np.vectorize(str2float.get)(data)
-    a_idx = np.where(data == str2float["A"])
-    count = 0
-    for x, y in zip(*a_idx):
-        count += A_belongs_to_x_mas(data, x, y)
-    return count
+    return count_x_mas(load_grid(file))
 
 
 if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves current day puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--word", type=str, default="XMAS", help="Word to search for in part 1"
+    )
+    parser.add_argument(
+        "--words", type=str, nargs="+", default=None, help="Batch of words to count"
+    )
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
+    if args.words:
+        search = WordSearch(load_grid(args.file))
+        for word, count in search.count(args.words).items():
+            print(f"{word}: {count}")
+
+    sol1 = part_1(file=args.file, word=args.word)
     sol2 = part_2(file=args.file)
 
     print(f"Part 1 solution: {sol1}")
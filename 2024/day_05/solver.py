@@ -1,77 +1,166 @@
 import argparse
 import collections
+import concurrent.futures
+import functools
+import heapq
+import os
+from typing import NamedTuple
 
+import numpy as np
 
-def read_data(file: str) -> tuple[dict[int, list[int]], list]:
+# Pages are at most two digits
+NB_PAGES = 100
+
+
+def read_data(file: str) -> tuple[np.ndarray, list]:
     """Returns:
-        - goes_after: a dictionary where values are lists of pages that go
-            after the key page.
+        - goes_before: a boolean matrix where goes_before[a, b] is True if
+            page a must be printed before page b.
         - page_updates: a list of pages to update.
     """
-    goes_after = collections.defaultdict(list)
+    goes_before = np.zeros((NB_PAGES, NB_PAGES), dtype=bool)
     page_updates = []
     with open(file, 'r') as f:
         for line in f.readlines():
             if "|" in line:
                 before, after = line.split("|")
-                goes_after[int(before)].append(int(after))
+                goes_before[int(before), int(after)] = True
             elif "," in line:
                 update = line.strip().split(",")
                 page_updates.append([int(n) for n in update])
             else:
                 continue
-    return goes_after, page_updates
+    return goes_before, page_updates
+
+
+def is_ordered(goes_before: np.ndarray, page_updates: list) -> np.ndarray:
+    """Checks every update at once: an update is ordered if no page must be
+    printed before one of the pages preceding it. Updates of equal length are
+    stacked and all their pairs of pages looked up in the matrix together."""
+    ordered = np.zeros(len(page_updates), dtype=bool)
+    by_length = collections.defaultdict(list)
+    for idx, update in enumerate(page_updates):
+        by_length[len(update)].append(idx)
+    for length, indices in by_length.items():
+        pages = np.array([page_updates[idx] for idx in indices])
+        # pairs[n, j, i] tells whether page j must go before page i
+        pairs = goes_before[pages[:, :, np.newaxis], pages[:, np.newaxis, :]]
+        ordered[indices] = ~np.tril(pairs, k=-1).any(axis=(1, 2))
+    return ordered
+
+
+def reorder(update: list, goes_before: np.ndarray) -> list:
+    """Sorts the pages of an update according to the rules."""
+    def compare(a: int, b: int) -> int:
+        return -1 if goes_before[a, b] else int(goes_before[b, a])
+    return sorted(update, key=functools.cmp_to_key(compare))
+
+
+def read_rule_graph(file: str) -> tuple[dict[int, set[int]], list]:
+    """Returns:
+        - goes_after: a dictionary where values are sets of pages that go
+            after the key page, for page ids of any size.
+        - page_updates: a list of pages to update.
+    """
+    goes_after = collections.defaultdict(set)
+    page_updates = []
+    with open(file, 'r') as f:
+        for line in f.readlines():
+            if "|" in line:
+                before, after = line.split("|")
+                goes_after[int(before)].add(int(after))
+            elif "," in line:
+                update = line.strip().split(",")
+                page_updates.append([int(n) for n in update])
+    return dict(goes_after), page_updates
+
+
+class UpdateReport(NamedTuple):
+    update: list[int]
+    ordered: bool
+    # Pages sorted according to the rules, None if they contain a cycle
+    corrected: list[int] | None
+    # Pages involved in or blocked by a cycle of rules
+    cycle: list[int]
+    # Whether the rules leave several valid orders
+    ambiguous: bool
+
+
+def check_update(update: list, goes_after: dict[int, set[int]]) -> UpdateReport:
+    """Sorts the pages of an update with Kahn's algorithm on the subgraph of the
+    rules induced by its pages.
+
+    Among the pages ready to be printed, the one appearing first in the update
+    is taken, so an ordered update is left as is. Having several pages ready
+    at once means the rules do not fully determine the order.
+    """
+    pages = set(update)
+    position = {page: idx for idx, page in enumerate(update)}
+    successors = {page: goes_after.get(page, set()) & pages for page in update}
+    in_degree = dict.fromkeys(update, 0)
+    for page in update:
+        for after in successors[page]:
+            in_degree[after] += 1
+
+    ready = [position[page] for page in update if in_degree[page] == 0]
+    heapq.heapify(ready)
+    corrected, ambiguous = [], False
+    while ready:
+        ambiguous |= len(ready) > 1
+        page = update[heapq.heappop(ready)]
+        corrected.append(page)
+        for after in successors[page]:
+            in_degree[after] -= 1
+            if in_degree[after] == 0:
+                heapq.heappush(ready, position[after])
+
+    if len(corrected) < len(update):
+        cycle = [page for page in update if in_degree[page] > 0]
+        return UpdateReport(update, False, None, cycle, ambiguous)
+    return UpdateReport(update, corrected == update, corrected, [], ambiguous)
+
+
+def check_updates(
+        goes_after: dict[int, set[int]], page_updates: list, workers: int = None
+) -> list[UpdateReport]:
+    """Checks all the updates, spread over a process pool unless workers is 1."""
+    check = functools.partial(check_update, goes_after=goes_after)
+    if workers == 1:
+        return list(map(check, page_updates))
+    workers = workers or os.cpu_count()
+    chunksize = max(1, len(page_updates) // (4 * workers))
+    with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+        return list(executor.map(check, page_updates, chunksize=chunksize))
+
+
+def middle_page_sums(reports: list[UpdateReport]) -> tuple[int, int]:
+    """Sums the middle pages of the ordered updates, and of the corrected
+    unordered ones. Updates whose rules contain a cycle have no valid order
+    and are left out."""
+    ordered = sum(r.update[len(r.update)//2] for r in reports if r.ordered)
+    corrected = sum(
+        r.corrected[len(r.corrected)//2]
+        for r in reports if not r.ordered and r.corrected is not None
+    )
+    return ordered, corrected
 
 
 def part_1(file: str) -> int:
-    goes_after, page_updates = read_data(file)
-    middle = []
-    for update in page_updates:
-        for idx in range(len(update)):
-            if any(
-                update[idx] in goes_after[val] for val in update[idx:]
-            ):
-                break
-        else:
-            middle.append(update[len(update)//2])
-    return sum(middle)
-
-
-def find_first_page(update: list, goes_after: dict[int, list[int]]) -> int:
-    """Finds the first page given the update and goes_after dictionary."""
-    if len(update) == 1:
-        return update[0]
-    for idx in range(len(update)):
-        curr = update[idx]
-        if all(
-            val in goes_after[curr] or curr not in goes_after[val]
-            for val in update[:idx] + update[idx+1:]
-        ):
-            return update[idx]
-    return None
+    goes_before, page_updates = read_data(file)
+    ordered = is_ordered(goes_before, page_updates)
+    return sum(
+        update[len(update)//2]
+        for update, ok in zip(page_updates, ordered) if ok
+    )
 
 
 def part_2(file: str) -> int:
-    goes_after, page_updates = read_data(file)
-
-    incorrectly_ordered = []
-    for update in page_updates:
-        update_seen = False
-        for idx in range(len(update)):
-            if any(
-                update[idx] in goes_after[val] for val in update[idx:]
-            ):
-                if not update_seen:
-                    incorrectly_ordered.append(update)
-                    update_seen = True
-
-    corrected = []
-    for update in incorrectly_ordered:
-        new_update, remaining = [], update.copy()
-        while len(new_update) != len(update):
-            new_update.append(find_first_page(remaining, goes_after))
-            remaining.pop(remaining.index(new_update[-1]))
-        corrected.append(new_update)
+    goes_before, page_updates = read_data(file)
+    ordered = is_ordered(goes_before, page_updates)
+    corrected = [
+        reorder(update, goes_before)
+        for update, ok in zip(page_updates, ordered) if not ok
+    ]
     return sum([update[len(update)//2] for update in corrected])
 
 
@@ -79,10 +168,27 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser(description="Solves current day puzzles")
     parser.add_argument("--file", type=str, help="Path to puzzle file")
+    parser.add_argument(
+        "--graph",
+        action="store_true",
+        help="Uses the topological sort engine, for page ids of any size",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes checking the updates"
+    )
     args = parser.parse_args()
 
-    sol1 = part_1(file=args.file)
-    sol2 = part_2(file=args.file)
+    if args.graph:
+        reports = check_updates(*read_rule_graph(args.file), workers=args.workers)
+        for idx, report in enumerate(reports):
+            if report.cycle:
+                print(f"Update {idx}: cycle among pages {report.cycle}")
+            elif report.ambiguous:
+                print(f"Update {idx}: several orders satisfy the rules")
+        sol1, sol2 = middle_page_sums(reports)
+    else:
+        sol1 = part_1(file=args.file)
+        sol2 = part_2(file=args.file)
 
     print(f"Part 1 solution: {sol1}")
     print(f"Part 2 solution: {sol2}")